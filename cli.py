@@ -43,8 +43,20 @@ def start_server_interactive():
     server = SyncServer(port=port, log_dir=log_dir)
     server.start()
 
-def start_client_interactive():
-    """交互式启动客户端"""
+def start_client_interactive(client=None):
+    """交互式启动客户端
+
+    Args:
+        client: 之前创建的客户端，不为None时复用该客户端及其连接
+
+    Returns:
+        客户端对象，供下次同步复用
+    """
+    if client is not None:
+        print(f"使用已有客户端同步: {client.server_ip}:{client.port}")
+        client.sync()
+        return client
+
     server_ip = input("请输入服务端IP地址: ")
     while not server_ip:
         print("服务端IP地址不能为空")
@@ -57,7 +69,8 @@ def start_client_interactive():
         port = int(port)
 
     client = SyncClient(server_ip=server_ip, port=port)
-    client.start()
+    client.sync()
+    return client
 
 def restore_files_interactive():
     """交互式恢复文件"""
@@ -132,20 +145,24 @@ def run_cli():
         except ValueError:
             print("时间格式错误，请使用 YYYY-MM-DD HH:MM:SS 格式")
     else:
-        # 交互式菜单
-        while True:
-            choice = show_menu()
-
-            if choice == "1":
-                start_server_interactive()
-                break
-            elif choice == "2":
-                start_client_interactive()
-                break
-            elif choice == "3":
-                restore_files_interactive()
-            elif choice == "0":
-                print("再见!")
-                break
-            else:
-                print("无效的选择，请重试")
+        # 交互式菜单，多次选择客户端同步时复用同一个客户端
+        client = None
+        try:
+            while True:
+                choice = show_menu()
+
+                if choice == "1":
+                    start_server_interactive()
+                    break
+                elif choice == "2":
+                    client = start_client_interactive(client)
+                elif choice == "3":
+                    restore_files_interactive()
+                elif choice == "0":
+                    print("再见!")
+                    break
+                else:
+                    print("无效的选择，请重试")
+        finally:
+            if client is not None:
+                client.close()
@@ -8,18 +8,38 @@
 """
 
 import time
+import hashlib
 import socket
 import json
 import sqlite3
+import logging
 import os
+import itertools
+import tempfile
 from pathlib import Path
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from config import (
-    DEFAULT_PORT, DEFAULT_BUFFER_SIZE, DEFAULT_TIME_THRESHOLD, DEFAULT_SIZE_THRESHOLD, 
+    DEFAULT_PORT, DEFAULT_BUFFER_SIZE, SOCKET_BUFFER_SIZE, DEFAULT_TIME_THRESHOLD, DEFAULT_SIZE_THRESHOLD,
+    DEFAULT_HASH_WORKERS, PROGRESS_CHECK_BYTES,
     logger, load_exclude_config, EXCLUDED_EXTENSIONS, EXCLUDED_DIRECTORIES, EXCLUDED_PATHS
 )
 from database import FileDatabase
-from utils import calculate_file_hash, send_data, receive_data, parse_json_response
+from utils import (
+    calculate_file_hash, send_data, receive_data, parse_json_response, send_file_header,
+    json_dumps, json_loads, glob_escape, PROTOCOL_VERSION
+)
+
+# 判断客户端文件c.path是否被排除的SQL表达式，规则由SyncClient._load_exclude_patterns写入temp.exclude_patterns
+_EXCLUDED_SQL = '''EXISTS (
+    SELECT 1 FROM temp.exclude_patterns e
+    WHERE CASE WHEN e.ext_len
+               THEN lower(c.path) GLOB e.pattern
+                    AND rtrim(substr(c.path, 1, length(c.path) - e.ext_len), '.') GLOB e.stem_pattern
+               ELSE c.path GLOB e.pattern
+          END
+)'''
 
 class SyncClient:
     """同步客户端"""
@@ -39,7 +59,7 @@ class SyncClient:
         self.script_dir = Path(__file__).resolve().parent
 
         # 加载排除规则
-        self.excluded_extensions, self.excluded_directories, self.excluded_paths = load_exclude_config(exclude_config)
+        self._set_exclude_rules(*load_exclude_config(exclude_config))
         logger.info(f"已加载排除规则: {len(self.excluded_extensions)} 个扩展名, {len(self.excluded_directories)} 个目录, {len(self.excluded_paths)} 个路径")
 
         # 初始化数据库
@@ -48,38 +68,57 @@ class SyncClient:
         # 时间差值
         self.time_diff = 0
 
-        # 扫描上一级目录
-        self.scan_parent_directory()
+        # 与服务端的连接，同步成功后保留以便复用
+        self.client_socket = None
+
+        # 在后台线程中扫描上一级目录，与连接服务端、下载数据库同时进行
+        self._scan_executor = ThreadPoolExecutor(max_workers=1)
+        self._scan_future = self._scan_executor.submit(self.scan_parent_directory)
 
         logger.info(f"客户端初始化完成，服务端地址: {server_ip}:{port}")
 
     def scan_parent_directory(self):
-        """扫描上一级目录"""
+        """扫描上一级目录
+
+        可能在后台线程中调用，因此使用单独的数据库连接
+        """
         parent_dir = self.script_dir.parent
         logger.info(f"开始扫描上一级目录: {parent_dir}")
-        file_count = self.db.scan_directory(parent_dir)
+        scan_db = FileDatabase(self.script_dir / "file_sync_client.db")
+        try:
+            file_count = scan_db.scan_directory(parent_dir)
+        finally:
+            scan_db.close()
         logger.info(f"扫描完成，共发现 {file_count} 个文件")
+        return file_count
 
     def start(self):
-        """启动客户端"""
-        client_socket = None
+        """启动客户端，同步一次后关闭"""
+        try:
+            self.sync()
+        finally:
+            self.close()
+
+    def sync(self):
+        """执行一次同步
+
+        同步成功后保持与服务端的连接，再次调用时复用该连接，省去重新建立TCP连接的开销
+        """
         max_retries = 3  # 最大重试次数
         retry_count = 0
-        
+
+        # 再次同步时重新扫描上一级目录
+        if self._scan_future is None:
+            self._scan_future = self._scan_executor.submit(self.scan_parent_directory)
+
         try:
             while retry_count < max_retries:
                 try:
-                    # 如果已经有socket连接，先关闭
-                    if client_socket:
-                        try:
-                            client_socket.close()
-                        except:
-                            pass
-                    
-                    # 创建新的socket连接
-                    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    client_socket.connect((self.server_ip, self.port))
-                    logger.info(f"已连接到服务端: {self.server_ip}:{self.port}")
+                    # 重试时连接状态未知，关闭后重新建立连接
+                    if retry_count > 0:
+                        self._close_connection()
+
+                    client_socket = self._get_connection()
 
                     # 同步时间
                     self.sync_time(client_socket)
@@ -93,15 +132,18 @@ class SyncClient:
                         time.sleep(2)  # 等待2秒后重试
                         continue
 
-                    # 对比文件清单，找出需要同步的文件
-                    files_to_sync = self.compare_files(server_db_path)
+                    try:
+                        # 对比文件清单，找出需要同步的文件
+                        files_to_sync = self.compare_files(server_db_path)
+
+                        # 同步文件
+                        self.sync_files(client_socket, files_to_sync)
+                    finally:
+                        self._remove_server_db(server_db_path)
 
-                    # 同步文件
-                    self.sync_files(client_socket, files_to_sync)
-                    
                     # 如果成功完成，跳出循环
                     break
-                    
+
                 except ConnectionRefusedError:
                     retry_count += 1
                     logger.error(f"无法连接到服务端: {self.server_ip}:{self.port}")
@@ -138,14 +180,61 @@ class SyncClient:
 
         except Exception as e:
             logger.error(f"同步过程中发生严重错误: {str(e)}")
-        finally:
-            if client_socket:
-                try:
-                    client_socket.close()
-                except:
-                    pass
-            self.db.close()
-            logger.info("客户端已关闭")
+
+        # 未能成功同步时连接状态未知，不再复用
+        if retry_count >= max_retries:
+            self._close_connection()
+
+    def _get_connection(self):
+        """获取与服务端的连接，已有连接时直接复用
+
+        Returns:
+            客户端socket
+        """
+        if self.client_socket is not None:
+            logger.info(f"复用已有连接: {self.server_ip}:{self.port}")
+            return self.client_socket
+
+        # 创建新的socket连接
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+            client_socket.connect((self.server_ip, self.port))
+            # 关闭Nagle算法，避免小的JSON控制消息被延迟发送
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        except:
+            client_socket.close()
+            raise
+
+        logger.info(f"已连接到服务端: {self.server_ip}:{self.port}")
+        self.client_socket = client_socket
+        return client_socket
+
+    def _close_connection(self):
+        """关闭与服务端的连接"""
+        if self.client_socket is not None:
+            try:
+                self.client_socket.close()
+            except:
+                pass
+            self.client_socket = None
+
+    def close(self):
+        """关闭客户端"""
+        # 通知服务端关闭连接
+        if self.client_socket is not None:
+            try:
+                send_data(self.client_socket, json_dumps({"type": "close"}))
+            except OSError:
+                pass
+        self._close_connection()
+
+        # 等待后台扫描结束后再关闭数据库
+        self._scan_executor.shutdown(wait=True)
+        self.db.close()
+        logger.info("客户端已关闭")
 
     def sync_time(self, client_socket):
         """同步时间
@@ -161,7 +250,7 @@ class SyncClient:
             "type": "time_sync",
             "client_time": time.time()
         }
-        send_data(client_socket, json.dumps(request))
+        send_data(client_socket, json_dumps(request))
 
         # 接收服务端响应
         response_data = receive_data(client_socket)
@@ -170,7 +259,7 @@ class SyncClient:
             return 0
             
         try:
-            response = json.loads(response_data)
+            response = json_loads(response_data)
         except json.JSONDecodeError as e:
             logger.error(f"时间同步失败: JSON解析错误 - {str(e)}")
             return 0
@@ -190,15 +279,16 @@ class SyncClient:
             client_socket: 客户端socket
 
         Returns:
-            服务端数据库文件路径
+            服务端数据库临时文件路径，使用完毕后需要删除
         """
+        server_db_path = None
         try:
             # 发送数据库下载请求
             logger.info("发送数据库下载请求...")
             request = {
                 "type": "db_download"
             }
-            send_data(client_socket, json.dumps(request))
+            send_data(client_socket, json_dumps(request))
 
             # 接收服务端响应
             logger.info("等待服务端响应...")
@@ -208,7 +298,7 @@ class SyncClient:
                 return None
                 
             try:
-                response = json.loads(response_data)
+                response = json_loads(response_data)
             except json.JSONDecodeError as e:
                 logger.error(f"数据库下载请求失败: JSON解析错误 - {str(e)}")
                 return None
@@ -223,37 +313,51 @@ class SyncClient:
 
             # 发送准备就绪信息
             logger.info("发送准备就绪信息...")
-            send_data(client_socket, json.dumps({"status": "ready"}))
+            send_data(client_socket, json_dumps({"status": "ready"}))
 
-            # 接收数据库文件
+            # 接收数据库文件，保存到临时文件中，对比完成后删除
             logger.info("开始接收数据库文件...")
-            server_db_path = self.script_dir / "server_file_sync.db"
-            
+            fd, temp_path = tempfile.mkstemp(prefix="server_file_sync_", suffix=".db")
+            server_db_path = Path(temp_path)
+
             # 设置socket超时
             original_timeout = client_socket.gettimeout()
             client_socket.settimeout(30)  # 设置30秒超时
-            
+
             try:
-                with open(server_db_path, 'wb') as f:
+                with os.fdopen(fd, 'wb') as f:
                     received_size = 0
-                    last_log_time = time.time()
-                    
+                    last_log_time = time.monotonic()
+                    next_check_size = PROGRESS_CHECK_BYTES
+
+                    # 复用同一块接收缓冲区，避免每次recv都分配新的bytes对象
+                    buf = bytearray(DEFAULT_BUFFER_SIZE)
+                    mv = memoryview(buf)
+
+                    # 边接收边计算SHA256，下载完成后无需重新读取文件即可校验
+                    sha256 = hashlib.sha256()
+
                     while received_size < file_size:
                         try:
-                            chunk = client_socket.recv(min(DEFAULT_BUFFER_SIZE, file_size - received_size))
-                            if not chunk:
+                            want = min(DEFAULT_BUFFER_SIZE, file_size - received_size)
+                            n = client_socket.recv_into(mv[:want])
+                            if n == 0:
                                 logger.warning("接收数据库文件时连接关闭")
                                 break
-                                
-                            f.write(chunk)
-                            received_size += len(chunk)
+
+                            f.write(mv[:n])
+                            sha256.update(mv[:n])
+                            received_size += n
                             
-                            # 每秒记录一次进度
-                            current_time = time.time()
-                            if current_time - last_log_time >= 1:
-                                logger.info(f"已接收 {received_size}/{file_size} 字节 ({received_size/file_size*100:.1f}%)")
-                                last_log_time = current_time
-                                
+                            # 每接收约1MB检查一次时间，每秒最多记录一次进度
+                            if received_size >= next_check_size:
+                                next_check_size = received_size + PROGRESS_CHECK_BYTES
+                                if logger.isEnabledFor(logging.INFO):
+                                    current_time = time.monotonic()
+                                    if current_time - last_log_time >= 1:
+                                        logger.info(f"已接收 {received_size}/{file_size} 字节 ({received_size/file_size*100:.1f}%)")
+                                        last_log_time = current_time
+
                         except socket.timeout:
                             logger.warning("接收数据库文件时超时")
                             break
@@ -266,9 +370,13 @@ class SyncClient:
 
             if received_size < file_size:
                 logger.warning(f"数据库文件下载不完整: 已接收 {received_size}/{file_size} 字节")
-                # 如果文件下载不完整，尝试重新连接
-                if received_size > 0:
-                    logger.info("保留已下载的部分数据库文件")
+                self._remove_server_db(server_db_path)
+                return None
+
+            expected_sha256 = response.get("sha256")
+            if expected_sha256 and sha256.hexdigest() != expected_sha256:
+                logger.warning("数据库文件校验失败: SHA256不匹配")
+                self._remove_server_db(server_db_path)
                 return None
 
             logger.info(f"数据库文件下载完成，大小: {received_size} 字节")
@@ -276,8 +384,36 @@ class SyncClient:
             
         except Exception as e:
             logger.error(f"下载服务端数据库时发生错误: {str(e)}")
+            if server_db_path is not None:
+                self._remove_server_db(server_db_path)
             return None
-            
+
+    def _remove_server_db(self, server_db_path):
+        """删除下载的服务端数据库临时文件
+
+        Args:
+            server_db_path: 服务端数据库文件路径
+        """
+        try:
+            os.unlink(server_db_path)
+        except OSError as e:
+            logger.warning(f"删除服务端数据库临时文件失败: {server_db_path}, 错误: {str(e)}")
+
+    def _set_exclude_rules(self, extensions, directories, paths):
+        """设置排除规则
+
+        Args:
+            extensions: 排除的文件扩展名集合（小写）
+            directories: 排除的目录名集合
+            paths: 排除的特定路径集合
+        """
+        self.excluded_extensions = extensions
+        self.excluded_directories = directories
+        self.excluded_paths = paths
+
+        # 预先计算排除路径的前缀，便于一次startswith完成匹配
+        self._excluded_path_prefixes = tuple(p + '/' for p in self.excluded_paths)
+
     def should_exclude_file(self, path):
         """检查文件是否应该被排除
         
@@ -287,130 +423,236 @@ class SyncClient:
         Returns:
             如果文件应该被排除，返回True，否则返回False
         """
+        str_path = path if isinstance(path, str) else str(path)
+        if os.sep != '/':
+            str_path = str_path.replace(os.sep, '/')
+
         # 检查特定路径
-        str_path = str(path)
-        for excluded_path in self.excluded_paths:
-            if str_path == excluded_path or str_path.startswith(excluded_path + '/'):
-                logger.debug(f"排除文件(路径匹配): {path}")
-                return True
-        
+        if str_path in self.excluded_paths or str_path.startswith(self._excluded_path_prefixes):
+            logger.debug(f"排除文件(路径匹配): {path}")
+            return True
+
         # 检查文件扩展名
-        suffix = Path(path).suffix.lower()
+        suffix = os.path.splitext(str_path)[1].lower()
         if suffix in self.excluded_extensions:
             logger.debug(f"排除文件(扩展名匹配): {path}")
             return True
-        
+
         # 检查目录名
-        parts = Path(path).parts
-        for part in parts:
+        for part in str_path.split('/'):
             if part in self.excluded_directories:
                 logger.debug(f"排除文件(目录匹配): {path}")
                 return True
-        
+
         return False
 
+    def _load_exclude_patterns(self, conn):
+        """将排除规则转换为GLOB模式并写入临时表
+
+        规则含义与should_exclude_file一致（见tests/test_exclude.py）：特定路径及其子路径、任意一级目录名、
+        文件扩展名（不区分大小写，按os.path.splitext取扩展名，因此.log这类只有前导点号的文件名没有扩展名）。
+        should_exclude_file永远匹配不到的规则（不以点号开头或含多个点号的扩展名、含路径分隔符的目录名）会被忽略
+
+        Args:
+            conn: 客户端数据库连接
+        """
+        sep = glob_escape(os.sep)
+        # 去掉扩展名及其前面的点号后，文件名中必须还剩其他字符
+        stem_pattern = '*[^' + os.sep + ']'
+        patterns = []
+        for excluded_path in self.excluded_paths:
+            pattern = glob_escape(excluded_path.replace('/', os.sep))
+            patterns.append((pattern, 0, None))
+            patterns.append((pattern + sep + '*', 0, None))
+        for dir_name in self.excluded_directories:
+            if '/' in dir_name or os.sep in dir_name:
+                continue
+            pattern = glob_escape(dir_name)
+            patterns.append((pattern, 0, None))
+            patterns.append((pattern + sep + '*', 0, None))
+            patterns.append(('*' + sep + pattern, 0, None))
+            patterns.append(('*' + sep + pattern + sep + '*', 0, None))
+        for ext in self.excluded_extensions:
+            if not ext.startswith('.') or '.' in ext[1:] or '/' in ext or os.sep in ext:
+                continue
+            patterns.append(('*' + glob_escape(ext.lower()), len(ext), stem_pattern))
+
+        # ext_len为0表示路径或目录规则，大于0表示扩展名规则及扩展名长度；表结构可能变化，每次重新创建
+        conn.execute("DROP TABLE IF EXISTS temp.exclude_patterns")
+        conn.execute("CREATE TEMP TABLE exclude_patterns (pattern TEXT NOT NULL, ext_len INTEGER NOT NULL, stem_pattern TEXT)")
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO temp.exclude_patterns (pattern, ext_len, stem_pattern) VALUES (?, ?, ?)", patterns)
+        # ATTACH不能在事务中执行，写入后立即提交
+        conn.commit()
+
     def compare_files(self, server_db_path):
         """对比文件清单，找出需要同步的文件
 
+        以生成器方式逐个产出需要同步的文件，调用方可以边对比边发送，无需在内存中保存完整列表
+
         Args:
             server_db_path: 服务端数据库文件路径
 
-        Returns:
-            需要同步的文件列表
+        Yields:
+            需要同步的文件信息字典
         """
-        # 连接服务端数据库
-        server_db = sqlite3.connect(server_db_path)
-        server_cursor = server_db.cursor()
-
-        # 获取服务端文件列表
-        server_cursor.execute('''
-        SELECT path, size, modified_time, hash, last_sync_time
-        FROM files
-        ORDER BY path
-        ''')
-
-        server_files = {}
-        for row in server_cursor.fetchall():
-            server_files[row[0]] = {
-                'path': row[0],
-                'size': row[1],
-                'modified_time': row[2],
-                'hash': row[3],
-                'last_sync_time': row[4]
-            }
+        # 等待后台目录扫描完成，保证客户端数据库是最新的
+        if self._scan_future is not None:
+            self._scan_future.result()
+            self._scan_future = None
 
-        # 获取客户端文件列表
-        client_files = {}
-        for file_info in self.db.get_all_files():
-            client_files[file_info['path']] = file_info
-
-        # 找出需要同步的文件
-        files_to_sync = []
         parent_dir = self.script_dir.parent
-        excluded_count = 0
-
-        # 遍历客户端文件
-        for path, client_file in client_files.items():
-            # 检查文件是否应该被排除
-            if self.should_exclude_file(path):
-                excluded_count += 1
-                continue
-                
-            server_file = server_files.get(path)
-
-            # 如果服务端没有该文件，或者文件大小不同，或者修改时间差异超过阈值
-            if (not server_file or
-                abs(client_file['size'] - server_file['size']) > DEFAULT_SIZE_THRESHOLD or
-                abs(client_file['modified_time'] - server_file['modified_time']) > DEFAULT_TIME_THRESHOLD):
-
-                # 计算文件哈希
-                full_path = parent_dir / path
-                if full_path.exists():
-                    file_hash = calculate_file_hash(full_path)
-                    file_size = full_path.stat().st_size
-                    file_mtime = full_path.stat().st_mtime
-
-                    # 如果服务端有该文件，且哈希值相同，则不需要同步
-                    if server_file and server_file['hash'] == file_hash:
+        sync_count = 0
+        updated_hashes = []
+        pending = deque()
+        cursor = None
+
+        # 将排除规则写入临时表，排除判断在SQLite中完成
+        conn = self.db.conn
+        self._load_exclude_patterns(conn)
+        excluded_count = conn.execute(f"SELECT COUNT(*) FROM files c WHERE {_EXCLUDED_SQL}").fetchone()[0]
+
+        # 将服务端数据库附加到客户端连接，由SQLite完成连接和大小/修改时间的初步筛选
+        conn.execute("ATTACH DATABASE ? AS srv", (str(server_db_path),))
+        try:
+            cursor = conn.execute(f'''
+            SELECT c.path, c.size, c.modified_time, c.hash, s.path, s.hash
+            FROM files c
+            LEFT JOIN srv.files s ON s.path = c.path
+            WHERE NOT {_EXCLUDED_SQL}
+              AND (s.path IS NULL
+                   OR abs(c.size - s.size) > ?
+                   OR abs(c.modified_time - s.modified_time) > ?)
+            ''', (DEFAULT_SIZE_THRESHOLD, DEFAULT_TIME_THRESHOLD))
+
+            # 并行计算候选文件的哈希（hashlib在计算时会释放GIL），同时限制在途任务数量
+            with ThreadPoolExecutor(max_workers=DEFAULT_HASH_WORKERS) as executor:
+                max_pending = DEFAULT_HASH_WORKERS * 4
+
+                # 被排除的文件已在SQL中过滤，不会返回到Python
+                for path, size, modified_time, client_hash, server_path, server_hash in cursor:
+                    full_path = parent_dir / path
+                    try:
+                        file_stat = full_path.stat()
+                    except OSError:
                         continue
 
-                    files_to_sync.append({
-                        'path': path,
-                        'size': file_size,
-                        'modified_time': file_mtime,
-                        'hash': file_hash
-                    })
+                    # 文件大小和修改时间与客户端数据库记录一致时，直接复用已保存的哈希
+                    if (client_hash and
+                        file_stat.st_size == size and
+                        abs(file_stat.st_mtime - modified_time) < 1e-3):
+                        future = Future()
+                        future.set_result(client_hash)
+                    else:
+                        future = executor.submit(calculate_file_hash, full_path)
+                    server_file = {'hash': server_hash} if server_path is not None else None
+                    pending.append((future, path, file_stat, client_hash, server_file))
+
+                    while len(pending) >= max_pending:
+                        file_info = self._collect_hash_result(pending.popleft(), updated_hashes)
+                        if file_info:
+                            sync_count += 1
+                            yield file_info
+
+                while pending:
+                    file_info = self._collect_hash_result(pending.popleft(), updated_hashes)
+                    if file_info:
+                        sync_count += 1
+                        yield file_info
+        finally:
+            # 调用方提前关闭生成器时查询仍未结束，必须先关闭游标，否则无法分离服务端数据库
+            if cursor is not None:
+                cursor.close()
+            try:
+                conn.execute("DETACH DATABASE srv")
+            except sqlite3.Error as e:
+                logger.error(f"分离服务端数据库失败: {str(e)}")
+
+            # 提前结束时也保留已经算完的哈希
+            while pending:
+                item = pending.popleft()
+                if item[0].done() and not item[0].cancelled():
+                    self._collect_hash_result(item, updated_hashes)
+
+            # 保存新计算的哈希，下次同步时即可跳过未变化的文件
+            if updated_hashes:
+                self.db.update_file_hashes(updated_hashes)
+
+        logger.info(f"文件对比完成，需要同步 {sync_count} 个文件，排除 {excluded_count} 个文件")
+
+    def _collect_hash_result(self, item, updated_hashes):
+        """获取候选文件的哈希计算结果
+
+        Args:
+            item: (future, path, file_stat, client_hash, server_file) 元组
+            updated_hashes: 用于收集需要写回客户端数据库的哈希
+
+        Returns:
+            需要同步的文件信息字典，不需要同步时返回None
+        """
+        future, path, file_stat, client_hash, server_file = item
+        try:
+            file_hash = future.result()
+        except OSError as e:
+            logger.warning(f"计算文件哈希失败: {path}, 错误: {str(e)}")
+            return None
+
+        if file_hash != client_hash:
+            updated_hashes.append((file_stat.st_size, file_stat.st_mtime, file_hash, path))
+
+        # 如果服务端有该文件，且哈希值相同，则不需要同步
+        if server_file and server_file['hash'] == file_hash:
+            return None
 
-        server_db.close()
-        logger.info(f"文件对比完成，需要同步 {len(files_to_sync)} 个文件，排除 {excluded_count} 个文件")
-        return files_to_sync
+        return {
+            'path': path,
+            'size': file_stat.st_size,
+            'modified_time': file_stat.st_mtime,
+            'hash': file_hash
+        }
 
     def sync_files(self, client_socket, files_to_sync):
         """同步文件
 
         Args:
             client_socket: 客户端socket
-            files_to_sync: 需要同步的文件列表
+            files_to_sync: 需要同步的文件（列表或compare_files返回的生成器）
+        """
+        files = iter(files_to_sync)
+        try:
+            self._send_files(client_socket, files)
+        finally:
+            # 提前结束时也要关闭生成器，释放compare_files附加的服务端数据库
+            if hasattr(files, 'close'):
+                files.close()
+
+    def _send_files(self, client_socket, files):
+        """发送文件，供sync_files调用
+
+        Args:
+            client_socket: 客户端socket
+            files: 需要同步的文件迭代器
         """
-        if not files_to_sync:
+        first_file = next(files, None)
+        if first_file is None:
             logger.info("没有文件需要同步")
             return
 
-        # 发送文件同步请求
+        # 发送文件同步请求，文件信息随后以数据帧的形式逐个发送
         request = {
             "type": "file_sync",
-            "files": files_to_sync
+            "protocol": PROTOCOL_VERSION
         }
-        send_data(client_socket, json.dumps(request))
+        send_data(client_socket, json_dumps(request))
 
         # 接收服务端准备就绪信息
         response_data = receive_data(client_socket)
         if not response_data:
             logger.error("文件同步失败: 未收到服务端响应")
             return
-            
+
         try:
-            response = json.loads(response_data)
+            response = json_loads(response_data)
         except json.JSONDecodeError as e:
             logger.error(f"文件同步失败: JSON解析错误 - {str(e)}")
             return
@@ -419,58 +661,39 @@ class SyncClient:
             logger.error(f"服务端未准备就绪: {response}")
             return
 
-        # 发送文件
+        # 依次发送所有文件（帧头 + 文件内容），中间不再等待服务端逐个确认
         sent_files = 0
-        file_count = len(files_to_sync)
         parent_dir = self.script_dir.parent
 
-        for file_info in files_to_sync:
+        for file_info in itertools.chain((first_file,), files):
             rel_path = file_info['path']
-            file_size = file_info['size']
             file_hash = file_info['hash']
+            full_path = parent_dir / rel_path
 
-            # 接收服务端准备接收文件的信息
-            response_data = receive_data(client_socket)
-            if not response_data:
-                logger.error(f"文件发送失败: {rel_path}, 未收到服务端响应")
-                continue
-                
             try:
-                response = json.loads(response_data)
-            except json.JSONDecodeError as e:
-                logger.error(f"文件发送失败: {rel_path}, JSON解析错误 - {str(e)}")
+                f = open(full_path, 'rb')
+            except OSError as e:
+                # 仍然发送一个不带哈希的帧，服务端会跳过该文件
+                logger.error(f"文件发送失败: {rel_path}, 错误: {str(e)}")
+                send_file_header(client_socket, rel_path, 0, 0, '')
                 continue
 
-            if response.get("status") != "ready_for_file":
-                logger.error(f"服务端未准备接收文件: {response}")
-                continue
+            with f:
+                # 以实际打开时的大小为准，避免文件在对比后发生变化导致数据帧错位
+                file_stat = os.fstat(f.fileno())
+                file_size = file_stat.st_size
+                send_file_header(client_socket, rel_path, file_size, file_stat.st_mtime, file_hash)
 
-            # 发送文件内容
-            full_path = parent_dir / rel_path
-            with open(full_path, 'rb') as f:
-                while True:
-                    chunk = f.read(DEFAULT_BUFFER_SIZE)
-                    if not chunk:
-                        break
-                    client_socket.sendall(chunk)
-
-            # 接收文件接收状态
-            response_data = receive_data(client_socket)
-            if not response_data:
-                logger.error(f"文件发送状态未知: {rel_path}, 未收到服务端响应")
-                continue
-                
-            try:
-                response = json.loads(response_data)
-            except json.JSONDecodeError as e:
-                logger.error(f"文件发送状态未知: {rel_path}, JSON解析错误 - {str(e)}")
-                continue
+                # 发送文件内容（使用sendfile零拷贝发送，不支持的平台会自动回退为普通发送）
+                sent_size = client_socket.sendfile(f, count=file_size) if file_size else 0
+                if sent_size != file_size:
+                    raise ConnectionError(f"文件发送不完整: {rel_path}, 已发送 {sent_size}/{file_size} 字节")
+
+            sent_files += 1
+            logger.info(f"已发送文件 ({sent_files}): {rel_path}")
 
-            if response.get("status") == "file_received":
-                sent_files += 1
-                logger.info(f"已发送文件 ({sent_files}/{file_count}): {rel_path}")
-            else:
-                logger.warning(f"文件发送失败: {rel_path}, 状态: {response.get('status')}")
+        # 发送结束帧（空路径）
+        send_file_header(client_socket, '', 0, 0, '')
 
         # 接收同步完成信息
         response_data = receive_data(client_socket)
@@ -479,13 +702,15 @@ class SyncClient:
             return
             
         try:
-            response = json.loads(response_data)
+            response = json_loads(response_data)
         except json.JSONDecodeError as e:
             logger.warning(f"同步完成状态未知: JSON解析错误 - {str(e)}")
             return
 
         if response.get("status") == "sync_complete":
             received_files = response.get("received_files", 0)
-            logger.info(f"同步完成，服务端成功接收 {received_files}/{file_count} 个文件")
+            logger.info(f"同步完成，服务端成功接收 {received_files}/{sent_files} 个文件")
+            for failed_path in response.get("failed", []):
+                logger.warning(f"服务端校验文件失败，将在下次同步时重新发送: {failed_path}")
         else:
             logger.warning(f"同步未正常完成: {response}")
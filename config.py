@@ -7,82 +7,132 @@
 包含常量定义和日志配置
 """
 
+import os
 import logging
 from pathlib import Path
 
+# 配置日志
+def setup_logging():
+    """设置基本日志配置"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler()
+        ]
+    )
+    return logging.getLogger("sync_tool")
+
+# 创建全局日志对象
+logger = setup_logging()
+
+def _env_number(name, default, convert=int):
+    """读取数值类型的环境变量
+
+    Args:
+        name: 环境变量名
+        default: 未设置或取值无效时使用的默认值
+        convert: 类型转换函数，如int或float
+
+    Returns:
+        环境变量的值，必须为有限的正数，否则返回默认值
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+
+    try:
+        number = convert(value)
+    except ValueError:
+        number = None
+
+    # 缓冲区大小、线程数和超时为0或负数时收发和线程池都无法正常工作
+    if number is None or not 0 < number < float('inf'):
+        logger.warning(f"环境变量 {name} 的值无效: {value!r}，必须是正数，使用默认值 {default}")
+        return default
+    return number
+
 # 默认配置
 DEFAULT_PORT = 8765
-DEFAULT_BUFFER_SIZE = 4096
+# 收发数据的缓冲区大小（字节），可通过环境变量 SYNC_BUFFER_SIZE 覆盖
+# 缓冲区越大，每MB数据所需的系统调用越少，吞吐量越高，但每个连接占用的内存也越多
+DEFAULT_BUFFER_SIZE = _env_number("SYNC_BUFFER_SIZE", 65536)
+SOCKET_BUFFER_SIZE = 1 << 20  # socket内核收发缓冲区大小（字节）
 DEFAULT_ENCODING = 'utf-8'
 DEFAULT_TIME_THRESHOLD = 60  # 文件修改时间阈值（秒）
 DEFAULT_SIZE_THRESHOLD = 10  # 文件大小阈值（字节）
+DEFAULT_HASH_WORKERS = min(8, (os.cpu_count() or 1) * 2)  # 并行计算文件哈希的线程数
+DEFAULT_SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # 并行扫描目录的线程数
+DEFAULT_DB_POOL_SIZE = max(4, os.cpu_count() or 1)  # 服务端数据库连接池保留的空闲连接数
+DEFAULT_CLIENT_WORKERS = _env_number("SYNC_CLIENT_WORKERS", 32)  # 服务端同时处理的客户端连接数
+CLIENT_IDLE_TIMEOUT = _env_number("SYNC_CLIENT_IDLE_TIMEOUT", 300, float)  # 客户端连接空闲超时（秒），超时后服务端关闭连接
+HASH_READ_SIZE = 1024 * 1024  # 计算哈希时每次读取的大小（字节）
+PROGRESS_CHECK_BYTES = 1024 * 1024  # 传输时每隔多少字节检查一次是否需要记录进度
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024  # 单条控制消息的最大长度（字节），超过时视为无效消息
 
 # 排除上传的文件和目录
-EXCLUDED_EXTENSIONS = ['.db', '.db-journal', '.log', '.pyc', '.pyo', '.pyd']  # 排除的文件扩展名
+EXCLUDED_EXTENSIONS = ['.db', '.db-journal', '.db-wal', '.db-shm', '.log', '.pyc', '.pyo', '.pyd']  # 排除的文件扩展名
 EXCLUDED_DIRECTORIES = ['__pycache__', 'backups', 'logs', '.git']  # 排除的目录名
 EXCLUDED_PATHS = []  # 排除的特定路径（相对于根目录）
 
+# 已解析的排除配置缓存，键为 (配置文件路径, 修改时间)
+_exclude_cache = {}
+
 # 读取排除配置文件
 def load_exclude_config(config_file='exclude.conf'):
     """从配置文件加载排除规则
-    
+
+    配置文件未修改时直接返回缓存的解析结果
+
     Args:
         config_file: 配置文件路径
-        
+
     Returns:
-        排除规则元组 (extensions, directories, paths)
+        排除规则元组 (extensions, directories, paths)，每一项都是frozenset
     """
     try:
-        extensions = list(EXCLUDED_EXTENSIONS)
-        directories = list(EXCLUDED_DIRECTORIES)
-        paths = list(EXCLUDED_PATHS)
-        
+        extensions = set(EXCLUDED_EXTENSIONS)
+        directories = set(EXCLUDED_DIRECTORIES)
+        paths = set(EXCLUDED_PATHS)
+
         config_path = Path(config_file)
-        if config_path.exists():
+        try:
+            cache_key = (str(config_path.resolve()), config_path.stat().st_mtime)
+        except FileNotFoundError:
+            cache_key = None
+
+        if cache_key is not None:
+            cached = _exclude_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            # 规则前缀与对应集合
+            prefixes = {'ext:': extensions, 'dir:': directories, 'path:': paths}
+
             with open(config_path, 'r', encoding=DEFAULT_ENCODING) as f:
                 for line in f:
                     line = line.strip()
                     # 跳过空行和注释
                     if not line or line.startswith('#'):
                         continue
-                    
-                    if line.startswith('ext:'):
-                        # 文件扩展名
-                        ext = line[4:].strip()
-                        if ext and ext not in extensions:
-                            extensions.append(ext)
-                    elif line.startswith('dir:'):
-                        # 目录名
-                        dir_name = line[4:].strip()
-                        if dir_name and dir_name not in directories:
-                            directories.append(dir_name)
-                    elif line.startswith('path:'):
-                        # 特定路径
-                        path = line[5:].strip()
-                        if path and path not in paths:
-                            paths.append(path)
-            
+
+                    for prefix, bucket in prefixes.items():
+                        if line.startswith(prefix):
+                            value = line[len(prefix):].strip()
+                            if value:
+                                bucket.add(value)
+                            break
+
             logger.info(f"已从配置文件 {config_file} 加载排除规则")
-        
-        return (extensions, directories, paths)
+
+        # 扩展名规则不区分大小写，统一转换为小写
+        result = (frozenset(ext.lower() for ext in extensions), frozenset(directories), frozenset(paths))
+        if cache_key is not None:
+            _exclude_cache[cache_key] = result
+        return result
     except Exception as e:
         logger.error(f"加载排除配置文件失败: {str(e)}")
-        return (EXCLUDED_EXTENSIONS, EXCLUDED_DIRECTORIES, EXCLUDED_PATHS)
-
-# 配置日志
-def setup_logging():
-    """设置基本日志配置"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger("sync_tool")
-
-# 创建全局日志对象
-logger = setup_logging()
+        return (frozenset(EXCLUDED_EXTENSIONS), frozenset(EXCLUDED_DIRECTORIES), frozenset(EXCLUDED_PATHS))
 
 def setup_file_logger(log_dir, name="sync_server"):
     """设置文件日志
@@ -97,6 +147,12 @@ def setup_file_logger(log_dir, name="sync_server"):
     log_dir.mkdir(exist_ok=True)
     
     log_file = log_dir / f"{name}_{datetime.now().strftime('%Y%m%d')}.log"
+
+    # 同一个日志文件只添加一次处理器，避免每条日志被重复写入
+    for handler in logger.handlers:
+        if isinstance(handler, logging.FileHandler) and handler.baseFilename == str(log_file.resolve()):
+            return
+
     file_handler = logging.FileHandler(log_file, encoding='utf-8')
     file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
     logger.addHandler(file_handler)
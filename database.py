@@ -11,17 +11,21 @@ import time
 import sqlite3
 from pathlib import Path
 import os
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from config import logger
+from config import DEFAULT_SCAN_WORKERS, DEFAULT_HASH_WORKERS, DEFAULT_DB_POOL_SIZE, logger
+from utils import calculate_file_hash
 
 class FileDatabase:
     """文件数据库管理类"""
 
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, create_tables=True):
         """初始化数据库
 
         Args:
             db_path: 数据库文件路径，默认为当前目录下的file_sync.db
+            create_tables: 是否创建表和索引，已确认表结构存在时（如连接池中的连接）可跳过
         """
         if db_path is None:
             self.db_path = Path("file_sync.db")
@@ -32,14 +36,30 @@ class FileDatabase:
         self.cursor = None
 
         # 初始化数据库
-        self.init_db()
+        self.init_db(create_tables)
 
-    def init_db(self):
-        """初始化数据库"""
+    def init_db(self, create_tables=True):
+        """初始化数据库
+
+        Args:
+            create_tables: 是否创建表和索引
+        """
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            # 使用自动提交模式，批量写入时显式开启事务
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
             self.cursor = self.conn.cursor()
 
+            # WAL模式下读写互不阻塞，并降低每次提交的fsync开销
+            self.cursor.execute("PRAGMA journal_mode=WAL")
+            self.cursor.execute("PRAGMA synchronous=NORMAL")
+            self.cursor.execute("PRAGMA temp_store=MEMORY")
+            self.cursor.execute("PRAGMA cache_size=-65536")
+            self.cursor.execute("PRAGMA mmap_size=1073741824")
+            self.cursor.execute("PRAGMA wal_autocheckpoint=1000")
+
+            if not create_tables:
+                return
+
             # 创建文件表
             self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS files (
@@ -66,6 +86,14 @@ class FileDatabase:
             )
             ''')
 
+            # 备份文件索引：按时间范围查询，以及查找每个原始路径的最新备份
+            self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_backup_time ON backup_files (backup_time)
+            ''')
+            self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_backup_orig ON backup_files (original_path, backup_time DESC)
+            ''')
+
             self.conn.commit()
             logger.info(f"数据库初始化完成: {self.db_path}")
         except sqlite3.Error as e:
@@ -74,6 +102,19 @@ class FileDatabase:
                 self.conn.close()
             raise
 
+    def checkpoint(self):
+        """将WAL中的内容写回主数据库文件
+
+        Returns:
+            是否成功
+        """
+        try:
+            self.cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"数据库检查点失败: {str(e)}")
+            return False
+
     def close(self):
         """关闭数据库连接"""
         if self.conn:
@@ -94,26 +135,42 @@ class FileDatabase:
             logger.error(f"目录不存在或不是一个有效的目录: {directory}")
             return 0
 
-        file_count = 0
         current_time = time.time()
+        file_count = 0
 
-        try:
-            for root, _, filenames in os.walk(directory):
-                for filename in filenames:
-                    file_path = Path(root) / filename
-                    rel_path = file_path.relative_to(directory)
-
-                    # 获取文件信息
-                    file_size = file_path.stat().st_size
-                    file_mtime = file_path.stat().st_mtime
+        # 遍历得到的路径都以该目录为前缀，直接截取得到相对路径，避免每个文件调用os.path.relpath
+        prefix_len = len(os.path.join(os.fspath(directory), ''))
 
-                    # 更新数据库
-                    self.cursor.execute('''
-                    INSERT OR REPLACE INTO files (path, size, modified_time, last_sync_time)
-                    VALUES (?, ?, ?, ?)
-                    ''', (str(rel_path), file_size, file_mtime, current_time))
+        def rows():
+            # 边遍历边产出数据，不在内存中保存完整的文件列表
+            nonlocal file_count
+            for file_path, file_size, file_mtime in self._walk_parallel(directory):
+                file_count += 1
+                yield (file_path[prefix_len:], file_size, file_mtime, current_time)
 
-                    file_count += 1
+        try:
+            # 在一个事务中批量更新数据库（文件大小和修改时间未变化时保留已计算的哈希）
+            self.cursor.execute("BEGIN")
+
+            # 空数据库不会有冲突，首次扫描直接插入，省去每行的冲突处理
+            self.cursor.execute("SELECT 1 FROM files LIMIT 1")
+            if self.cursor.fetchone() is None:
+                sql = '''
+                INSERT INTO files (path, size, modified_time, last_sync_time)
+                VALUES (?, ?, ?, ?)
+                '''
+            else:
+                sql = '''
+                INSERT INTO files (path, size, modified_time, last_sync_time)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    hash = CASE WHEN files.size = excluded.size AND files.modified_time = excluded.modified_time
+                                THEN files.hash ELSE NULL END,
+                    size = excluded.size,
+                    modified_time = excluded.modified_time,
+                    last_sync_time = excluded.last_sync_time
+                '''
+            self.cursor.executemany(sql, rows())
 
             self.conn.commit()
             logger.info(f"扫描完成，共处理 {file_count} 个文件")
@@ -123,6 +180,86 @@ class FileDatabase:
             self.conn.rollback()
             return 0
 
+    def _walk_parallel(self, directory):
+        """并行遍历目录下的所有文件
+
+        顶层目录中的每个子目录交给线程池分别遍历，结果由调用线程统一产出，数据库写入仍然只在调用线程中进行
+
+        Args:
+            directory: 要遍历的目录
+
+        Yields:
+            (文件路径, 文件大小, 修改时间) 元组
+        """
+        directory = os.fspath(directory)
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError as e:
+            logger.warning(f"无法读取目录: {directory}, 错误: {str(e)}")
+            return
+
+        with ThreadPoolExecutor(max_workers=DEFAULT_SCAN_WORKERS) as executor:
+            futures = []
+
+            def submit_dir(path):
+                futures.append(executor.submit(list, self._walk(path)))
+
+            for entry in entries:
+                file_info = self._scan_entry(entry, submit_dir)
+                if file_info is not None:
+                    yield file_info
+
+            for future in as_completed(futures):
+                yield from future.result()
+
+    def _scan_entry(self, entry, add_dir):
+        """处理遍历到的一个目录项，_walk和_walk_parallel共用
+
+        Args:
+            entry: os.scandir返回的目录项
+            add_dir: 遇到需要继续遍历的子目录时调用的函数，参数为子目录路径
+
+        Returns:
+            文件返回 (文件路径, 文件大小, 修改时间) 元组，目录或无法获取信息时返回None
+        """
+        try:
+            if entry.is_dir():
+                # 与os.walk一致，不进入指向目录的符号链接
+                if not entry.is_symlink():
+                    add_dir(entry.path)
+                return None
+
+            st = entry.stat()
+        except OSError as e:
+            logger.warning(f"无法获取文件信息: {entry.path}, 错误: {str(e)}")
+            return None
+
+        return entry.path, st.st_size, st.st_mtime
+
+    def _walk(self, directory):
+        """遍历目录下的所有文件
+
+        使用os.scandir和显式栈迭代遍历，目录项自带的类型信息和缓存的stat结果可以减少系统调用
+
+        Args:
+            directory: 要遍历的目录
+
+        Yields:
+            (文件路径, 文件大小, 修改时间) 元组
+        """
+        stack = [os.fspath(directory)]
+        while stack:
+            current_dir = stack.pop()
+            try:
+                with os.scandir(current_dir) as it:
+                    for entry in it:
+                        file_info = self._scan_entry(entry, stack.append)
+                        if file_info is not None:
+                            yield file_info
+            except OSError as e:
+                logger.warning(f"无法读取目录: {current_dir}, 错误: {str(e)}")
+
     def get_file_info(self, file_path):
         """获取文件信息
 
@@ -180,6 +317,142 @@ class FileDatabase:
             logger.error(f"获取所有文件信息失败: {str(e)}")
             return []
 
+    def update_file_hashes(self, rows):
+        """批量更新文件哈希
+
+        Args:
+            rows: (size, modified_time, hash, path) 元组列表
+
+        Returns:
+            是否成功
+        """
+        try:
+            self.cursor.execute("BEGIN")
+            self.cursor.executemany('''
+            UPDATE files SET size = ?, modified_time = ?, hash = ?
+            WHERE path = ?
+            ''', rows)
+
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"更新文件哈希失败: {str(e)}")
+            self.conn.rollback()
+            return False
+
+    def populate_hashes(self, directory, paths=None, exclude=None):
+        """并行计算文件哈希并写回数据库
+
+        Args:
+            directory: 文件相对路径所基于的目录
+            paths: 要计算哈希的文件相对路径列表，为None时计算所有尚无哈希的文件
+            exclude: 判断是否跳过某个文件的函数，参数为文件相对路径，为None时不跳过任何文件
+
+        Returns:
+            成功计算哈希的文件数量
+        """
+        try:
+            if paths is None:
+                self.cursor.execute("SELECT path, size, modified_time FROM files WHERE hash IS NULL")
+                targets = self.cursor.fetchall()
+            else:
+                targets = []
+                for path in paths:
+                    self.cursor.execute("SELECT path, size, modified_time FROM files WHERE path = ?", (str(path),))
+                    row = self.cursor.fetchone()
+                    if row:
+                        targets.append(row)
+        except sqlite3.Error as e:
+            logger.error(f"获取待计算哈希的文件失败: {str(e)}")
+            return 0
+
+        if exclude is not None:
+            targets = [target for target in targets if not exclude(target[0])]
+
+        if not targets:
+            return 0
+
+        directory = os.fspath(directory)
+        rows = []
+        # hashlib在计算时会释放GIL，多个文件可以在线程中并行计算
+        with ThreadPoolExecutor(max_workers=DEFAULT_HASH_WORKERS) as executor:
+            futures = {
+                executor.submit(calculate_file_hash, os.path.join(directory, path)): (path, size, modified_time)
+                for path, size, modified_time in targets
+            }
+            for future in as_completed(futures):
+                path, size, modified_time = futures[future]
+                try:
+                    rows.append((future.result(), path, size, modified_time))
+                except OSError as e:
+                    logger.warning(f"计算文件哈希失败: {path}, 错误: {str(e)}")
+
+        try:
+            # 只在文件大小和修改时间仍与记录一致时写入，避免把旧内容的哈希记到已变化的文件上
+            self.cursor.execute("BEGIN")
+            self.cursor.executemany('''
+            UPDATE files SET hash = ?
+            WHERE path = ? AND size = ? AND modified_time = ?
+            ''', rows)
+
+            self.conn.commit()
+            return len(rows)
+        except sqlite3.Error as e:
+            logger.error(f"保存文件哈希失败: {str(e)}")
+            self.conn.rollback()
+            return 0
+
+    def update_synced_files(self, rows):
+        """批量记录同步完成的文件
+
+        Args:
+            rows: (path, size, modified_time, hash, last_sync_time) 元组列表
+
+        Returns:
+            是否成功
+        """
+        try:
+            self.cursor.execute("BEGIN")
+            self.cursor.executemany('''
+            INSERT INTO files (path, size, modified_time, hash, last_sync_time)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                size = excluded.size,
+                modified_time = excluded.modified_time,
+                hash = excluded.hash,
+                last_sync_time = excluded.last_sync_time
+            ''', rows)
+
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"记录同步文件失败: {str(e)}")
+            self.conn.rollback()
+            return False
+
+    def backup_files_batch(self, rows):
+        """批量备份文件记录
+
+        Args:
+            rows: (original_path, backup_path, size, modified_time, backup_time, hash) 元组列表
+
+        Returns:
+            是否成功
+        """
+        try:
+            self.cursor.execute("BEGIN")
+            self.cursor.executemany('''
+            INSERT INTO backup_files (original_path, backup_path, size, modified_time, backup_time, hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"批量备份文件记录失败: {str(e)}")
+            self.conn.rollback()
+            return False
+
     def backup_file(self, original_path, backup_path, size, modified_time, hash_value=None):
         """备份文件记录
 
@@ -239,3 +512,88 @@ class FileDatabase:
         except sqlite3.Error as e:
             logger.error(f"获取备份文件失败: {str(e)}")
             return []
+
+    def get_latest_backup_files_by_time_range(self, start_time, end_time):
+        """根据时间范围获取每个原始路径最新的备份文件
+
+        Args:
+            start_time: 开始时间戳
+            end_time: 结束时间戳
+
+        Returns:
+            备份文件列表，每个原始路径只保留时间范围内最新的一个备份
+        """
+        try:
+            # SQLite中与MAX()一起查询的其他列取自最大值所在的行
+            self.cursor.execute('''
+            SELECT original_path, backup_path, size, modified_time, MAX(backup_time) AS backup_time, hash
+            FROM backup_files
+            WHERE backup_time BETWEEN ? AND ?
+            GROUP BY original_path
+            ''', (start_time, end_time))
+
+            backup_files = []
+            for row in self.cursor.fetchall():
+                backup_files.append({
+                    'original_path': row[0],
+                    'backup_path': row[1],
+                    'size': row[2],
+                    'modified_time': row[3],
+                    'backup_time': row[4],
+                    'hash': row[5]
+                })
+            return backup_files
+        except sqlite3.Error as e:
+            logger.error(f"获取备份文件失败: {str(e)}")
+            return []
+
+
+class ConnectionPool:
+    """数据库连接池
+
+    复用已打开的FileDatabase连接，避免每个客户端连接都重新打开数据库。
+    池中没有空闲连接时创建新连接，归还时超出容量的连接直接关闭。
+    """
+
+    def __init__(self, db_path, size=DEFAULT_DB_POOL_SIZE):
+        """初始化连接池
+
+        Args:
+            db_path: 数据库文件路径，调用方需保证表结构已创建
+            size: 最多保留的空闲连接数
+        """
+        self.db_path = Path(db_path)
+        self._idle = queue.Queue(maxsize=size)
+
+    def acquire(self):
+        """获取一个数据库连接
+
+        Returns:
+            FileDatabase对象
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return FileDatabase(self.db_path, create_tables=False)
+
+    def release(self, db):
+        """归还数据库连接
+
+        Args:
+            db: 通过acquire获取的FileDatabase对象
+        """
+        try:
+            # 回滚可能残留的未提交事务，保证下一个使用者拿到干净的连接
+            if db.conn.in_transaction:
+                db.conn.rollback()
+            self._idle.put_nowait(db)
+        except (queue.Full, sqlite3.Error):
+            db.close()
+
+    def close(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -41,59 +41,73 @@ class FileRestorer:
         Returns:
             恢复的文件数量
         """
-        # 获取备份文件列表
-        backup_files = self.db.get_backup_files_by_time_range(start_time, end_time)
+        # 获取备份文件列表，每个原始路径只保留最新的备份
+        latest_backups = self.db.get_latest_backup_files_by_time_range(start_time, end_time)
 
-        if not backup_files:
+        if not latest_backups:
             logger.info(f"在指定时间范围内没有找到备份文件: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))} - {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(end_time))}")
             return 0
 
-        logger.info(f"找到 {len(backup_files)} 个备份文件")
+        logger.info(f"找到 {len(latest_backups)} 个需要恢复的备份文件")
 
-        # 按原始路径分组，只保留每个路径最新的备份
-        latest_backups = {}
-        for backup in backup_files:
-            original_path = backup['original_path']
-            if original_path not in latest_backups or backup['backup_time'] > latest_backups[original_path]['backup_time']:
-                latest_backups[original_path] = backup
-
-        # 恢复文件
+        # 恢复文件，数据库更新在一个事务中完成
         restored_count = 0
-        parent_dir = self.script_dir.parent
-
-        for original_path, backup in latest_backups.items():
-            # 构建完整的目标路径
-            full_dest_path = parent_dir / original_path
-
-            # 构建完整的备份文件路径
-            backup_path = self.script_dir / backup['backup_path']
-
-            if not backup_path.exists():
-                logger.warning(f"备份文件不存在: {backup_path}")
-                continue
-
-            # 确保目标目录存在
-            full_dest_path.parent.mkdir(parents=True, exist_ok=True)
-
-            try:
-                # 复制备份文件到原始位置
-                shutil.copy2(backup_path, full_dest_path)
-
-                # 恢复文件修改时间
-                os.utime(full_dest_path, (time.time(), backup['modified_time']))
-
-                # 更新数据库
-                self.db.cursor.execute('''
-                INSERT OR REPLACE INTO files (path, size, modified_time, hash, last_sync_time)
-                VALUES (?, ?, ?, ?, ?)
-                ''', (original_path, backup['size'], backup['modified_time'], backup['hash'], time.time()))
-
-                restored_count += 1
-                logger.info(f"已恢复文件 ({restored_count}/{len(latest_backups)}): {original_path}")
-            except Exception as e:
-                logger.error(f"恢复文件失败: {original_path}, 错误: {str(e)}")
+        parent_dir = str(self.script_dir.parent)
+        script_dir = str(self.script_dir)
+        self.db.cursor.execute("BEGIN")
+
+        # 循环中直接使用字符串路径，并把常用函数绑定到局部变量，减少每个文件的对象创建和属性查找
+        join = os.path.join
+        exists = os.path.exists
+        dirname = os.path.dirname
+        makedirs = os.makedirs
+        utime = os.utime
+        copy2 = shutil.copy2
+        execute = self.db.cursor.execute
+
+        try:
+            for backup in latest_backups:
+                original_path = backup['original_path']
+
+                # 构建完整的目标路径
+                full_dest_path = join(parent_dir, original_path)
+
+                # 构建完整的备份文件路径
+                backup_path = join(script_dir, backup['backup_path'])
+
+                if not exists(backup_path):
+                    logger.warning(f"备份文件不存在: {backup_path}")
+                    continue
+
+                try:
+                    # 确保目标目录存在
+                    makedirs(dirname(full_dest_path), exist_ok=True)
+
+                    # 复制备份文件到原始位置
+                    copy2(backup_path, full_dest_path)
+
+                    # 恢复文件修改时间
+                    utime(full_dest_path, (time.time(), backup['modified_time']))
+
+                    # 更新数据库
+                    execute('''
+                    INSERT INTO files (path, size, modified_time, hash, last_sync_time)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        size = excluded.size,
+                        modified_time = excluded.modified_time,
+                        hash = excluded.hash,
+                        last_sync_time = excluded.last_sync_time
+                    ''', (original_path, backup['size'], backup['modified_time'], backup['hash'], time.time()))
+
+                    restored_count += 1
+                    logger.info(f"已恢复文件 ({restored_count}/{len(latest_backups)}): {original_path}")
+                except Exception as e:
+                    logger.error(f"恢复文件失败: {original_path}, 错误: {str(e)}")
+        finally:
+            # 已复制到原始位置的文件都要写入数据库，即使循环因意外错误中断也提交已完成的部分
+            self.db.conn.commit()
 
-        self.db.conn.commit()
         logger.info(f"文件恢复完成，共恢复 {restored_count} 个文件")
         return restored_count
 
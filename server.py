@@ -13,12 +13,21 @@ import socket
 import json
 import threading
 import queue
-import shutil
+import stat
+import hashlib
 from pathlib import Path
-
-from config import DEFAULT_PORT, DEFAULT_BUFFER_SIZE, logger, setup_file_logger
-from database import FileDatabase
-from utils import calculate_file_hash, send_data, receive_data
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    DEFAULT_PORT, DEFAULT_BUFFER_SIZE, DEFAULT_ENCODING, SOCKET_BUFFER_SIZE, PROGRESS_CHECK_BYTES,
+    DEFAULT_CLIENT_WORKERS, CLIENT_IDLE_TIMEOUT, EXCLUDED_EXTENSIONS, EXCLUDED_DIRECTORIES, EXCLUDED_PATHS,
+    logger, setup_file_logger
+)
+from database import FileDatabase, ConnectionPool
+from utils import (
+    calculate_file_hash, copy_file, send_data, receive_data, receive_file_header, json_dumps, json_loads,
+    PROTOCOL_VERSION
+)
 
 class SyncServer:
     """同步服务端"""
@@ -47,19 +56,28 @@ class SyncServer:
         # 创建socket
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # 接收缓冲区需在listen之前设置，接受的连接会继承该值并据此协商TCP窗口
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
 
         # 客户端连接队列
         self.clients = queue.Queue()
 
+        # 客户端处理线程池，限制同时处理的客户端数量
+        # 空闲的持久连接在CLIENT_IDLE_TIMEOUT后关闭；处理线程全部占用时直接拒绝新连接，而不是让其无限排队
+        self.client_executor = ThreadPoolExecutor(max_workers=DEFAULT_CLIENT_WORKERS, thread_name_prefix="sync-client")
+        self.client_slots = threading.BoundedSemaphore(DEFAULT_CLIENT_WORKERS)
+
         # 获取当前脚本所在目录
         self.script_dir = Path(__file__).resolve().parent
 
         # 设置备份目录
         self.backup_dir = self.script_dir / "backups"
         self.backup_dir.mkdir(exist_ok=True)
+        self.backup_dev = self.backup_dir.stat().st_dev
 
-        # 初始化数据库
+        # 初始化数据库（同时创建表结构），客户端处理线程从连接池获取连接
         self.db = FileDatabase(self.script_dir / "file_sync.db")
+        self.db_pool = ConnectionPool(self.db.db_path)
 
         # 扫描上一级目录
         self.scan_parent_directory()
@@ -73,6 +91,45 @@ class SyncServer:
         file_count = self.db.scan_directory(parent_dir)
         logger.info(f"扫描完成，共发现 {file_count} 个文件")
 
+    def populate_hashes(self):
+        """计算尚无哈希的文件的哈希
+
+        服务端开始监听后在后台线程中调用，不影响接受客户端连接。
+        客户端对比时可以直接使用这些哈希，备份时也无需重新读取文件；
+        尚未计算完成的文件在对比和备份时仍会按需计算
+        """
+        db = self.db_pool.acquire()
+        try:
+            hashed_count = db.populate_hashes(self.script_dir.parent, exclude=self._skip_prehash)
+            if hashed_count:
+                logger.info(f"已计算 {hashed_count} 个文件的哈希")
+        except Exception as e:
+            logger.error(f"计算文件哈希时发生错误: {str(e)}")
+        finally:
+            self.db_pool.release(db)
+
+    def _skip_prehash(self, path):
+        """判断预先计算哈希时是否跳过该文件
+
+        服务端自身目录下的数据库、备份和日志，以及默认排除规则匹配的文件，客户端从不同步，无需计算哈希；
+        其中数据库和WAL文件一直在变化，每次启动都会被重新计算
+
+        Args:
+            path: 文件相对路径
+
+        Returns:
+            需要跳过时返回True，否则返回False
+        """
+        parts = path.split(os.sep)
+        if parts[0] == self.script_dir.name:
+            return True
+        rel_path = path.replace(os.sep, '/')
+        if any(rel_path == excluded or rel_path.startswith(excluded + '/') for excluded in EXCLUDED_PATHS):
+            return True
+        if os.path.splitext(path)[1].lower() in EXCLUDED_EXTENSIONS:
+            return True
+        return any(part in EXCLUDED_DIRECTORIES for part in parts)
+
     def start(self):
         """启动服务端"""
         try:
@@ -87,6 +144,11 @@ class SyncServer:
             client_handler.daemon = True
             client_handler.start()
 
+            # 在后台预先计算文件哈希
+            hash_worker = threading.Thread(target=self.populate_hashes)
+            hash_worker.daemon = True
+            hash_worker.start()
+
             # 接受客户端连接
             while True:
                 client_socket, client_address = self.server_socket.accept()
@@ -99,6 +161,8 @@ class SyncServer:
             logger.error(f"服务端发生错误: {str(e)}")
         finally:
             self.server_socket.close()
+            self.client_executor.shutdown(wait=False)
+            self.db_pool.close()
             self.db.close()
             logger.info("服务端已关闭")
 
@@ -107,12 +171,47 @@ class SyncServer:
         while True:
             try:
                 client_socket, client_address = self.clients.get(timeout=1)
-                threading.Thread(target=self.handle_client, args=(client_socket, client_address)).start()
+                if not self.client_slots.acquire(blocking=False):
+                    threading.Thread(target=self.reject_client, args=(client_socket, client_address), daemon=True).start()
+                    continue
+                self.client_executor.submit(self._serve_client, client_socket, client_address)
             except queue.Empty:
                 continue
             except Exception as e:
                 logger.error(f"处理客户端连接时发生错误: {str(e)}")
 
+    def reject_client(self, client_socket, client_address):
+        """处理线程已满时拒绝客户端连接，在单独的线程中调用，不阻塞连接分发
+
+        Args:
+            client_socket: 客户端socket
+            client_address: 客户端地址
+        """
+        logger.warning(f"同时连接的客户端已达上限 ({DEFAULT_CLIENT_WORKERS})，拒绝客户端 {client_address[0]}:{client_address[1]}")
+        try:
+            send_data(client_socket, json_dumps({"status": "error", "message": "Server busy"}))
+            # 读完客户端已发送的请求后再关闭，避免未读数据触发RST导致客户端收不到错误信息
+            client_socket.shutdown(socket.SHUT_WR)
+            client_socket.settimeout(5)
+            while client_socket.recv(DEFAULT_BUFFER_SIZE):
+                pass
+        except OSError:
+            pass
+        finally:
+            client_socket.close()
+
+    def _serve_client(self, client_socket, client_address):
+        """在线程池中处理客户端连接，结束后释放占用的处理名额
+
+        Args:
+            client_socket: 客户端socket
+            client_address: 客户端地址
+        """
+        try:
+            self.handle_client(client_socket, client_address)
+        finally:
+            self.client_slots.release()
+
     def handle_client(self, client_socket, client_address):
         """处理单个客户端连接
 
@@ -122,23 +221,27 @@ class SyncServer:
         """
         client_ip = client_address[0]
 
-        # 为当前线程创建单独的数据库连接
-        thread_db = FileDatabase(self.script_dir / "file_sync.db")
+        # 从连接池获取当前线程使用的数据库连接
+        thread_db = self.db_pool.acquire()
 
         try:
             # 持续处理客户端请求，直到连接关闭或出错
             while True:
-                # 接收客户端请求类型
+                # 等待下一个请求时，客户端长时间不发送数据则关闭连接，避免空闲的持久连接一直占用处理线程
+                client_socket.settimeout(CLIENT_IDLE_TIMEOUT)
                 request_data = receive_data(client_socket)
-                if not request_data or request_data == "{}":
+                if not request_data or request_data == b"{}":
                     logger.info(f"客户端 {client_ip} 关闭连接")
                     break
 
+                # 处理请求期间客户端可能在两个数据帧之间计算哈希，不按空闲处理
+                client_socket.settimeout(None)
+
                 try:
-                    request = json.loads(request_data)
+                    request = json_loads(request_data)
                 except json.JSONDecodeError as e:
                     logger.error(f"解析JSON数据失败: {str(e)}")
-                    send_data(client_socket, json.dumps({"status": "error", "message": "Invalid JSON data"}))
+                    send_data(client_socket, json_dumps({"status": "error", "message": "Invalid JSON data"}))
                     continue
 
                 request_type = request.get('type')
@@ -149,7 +252,7 @@ class SyncServer:
                     self.handle_time_sync(client_socket, request)
                 elif request_type == 'db_download':
                     # 处理数据库下载请求
-                    self.handle_db_download(client_socket)
+                    self.handle_db_download(client_socket, thread_db)
                 elif request_type == 'file_sync':
                     # 处理文件同步请求
                     self.handle_file_sync(client_socket, client_ip, request, thread_db)
@@ -159,17 +262,19 @@ class SyncServer:
                     break
                 else:
                     logger.warning(f"未知的请求类型: {request_type}")
-                    send_data(client_socket, json.dumps({"status": "error", "message": "Unknown request type"}))
+                    send_data(client_socket, json_dumps({"status": "error", "message": "Unknown request type"}))
 
+        except socket.timeout:
+            logger.info(f"客户端 {client_ip} 超过 {CLIENT_IDLE_TIMEOUT:g} 秒没有发送数据，关闭连接")
         except Exception as e:
             logger.error(f"处理客户端 {client_ip} 时发生错误: {str(e)}")
             try:
-                send_data(client_socket, json.dumps({"status": "error", "message": str(e)}))
+                send_data(client_socket, json_dumps({"status": "error", "message": str(e)}))
             except:
                 pass
         finally:
-            # 关闭线程数据库连接
-            thread_db.close()
+            # 归还线程数据库连接
+            self.db_pool.release(thread_db)
             client_socket.close()
             logger.info(f"客户端 {client_ip} 连接已关闭")
 
@@ -190,28 +295,34 @@ class SyncServer:
             "time_diff": server_time - client_time
         }
 
-        send_data(client_socket, json.dumps(response))
+        send_data(client_socket, json_dumps(response))
         logger.info(f"时间同步完成，时间差: {server_time - client_time:.2f}秒")
 
-    def handle_db_download(self, client_socket):
+    def handle_db_download(self, client_socket, thread_db=None):
         """处理数据库下载请求
 
         Args:
             client_socket: 客户端socket
+            thread_db: 线程特定的数据库连接，如果为None则使用全局数据库连接
         """
+        db = thread_db if thread_db is not None else self.db
         try:
             db_path = self.script_dir / "file_sync.db"
             logger.info(f"收到数据库下载请求，数据库路径: {db_path}")
 
             if not db_path.exists():
                 logger.error(f"数据库文件不存在: {db_path}")
-                send_data(client_socket, json.dumps({"status": "error", "message": "Database file not found"}))
+                send_data(client_socket, json_dumps({"status": "error", "message": "Database file not found"}))
                 return
 
-            # 发送数据库文件大小
+            # WAL模式下最近的修改可能还在-wal文件中，发送前先写回主数据库文件
+            db.checkpoint()
+
+            # 发送数据库文件大小和SHA256，客户端据此校验下载的文件
             file_size = db_path.stat().st_size
+            file_sha256 = calculate_file_hash(db_path, 'sha256')
             logger.info(f"准备发送数据库文件，大小: {file_size} 字节")
-            send_data(client_socket, json.dumps({"status": "ok", "size": file_size}))
+            send_data(client_socket, json_dumps({"status": "ok", "size": file_size, "sha256": file_sha256}))
 
             # 接收客户端准备就绪信息
             logger.info("等待客户端准备就绪...")
@@ -222,7 +333,7 @@ class SyncServer:
                 return
 
             try:
-                response = json.loads(response_data)
+                response = json_loads(response_data)
             except json.JSONDecodeError as e:
                 logger.error(f"解析客户端准备就绪信息失败: {str(e)}")
                 return
@@ -232,18 +343,17 @@ class SyncServer:
                 return
 
             logger.info("开始发送数据库文件...")
-            # 发送数据库文件
+            # 发送数据库文件（使用sendfile零拷贝发送，每次发送PROGRESS_CHECK_BYTES字节以便记录进度）
             try:
+                client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
                 with open(db_path, 'rb') as f:
                     sent_size = 0
-                    while True:
-                        chunk = f.read(DEFAULT_BUFFER_SIZE)
-                        if not chunk:
+                    while sent_size < file_size:
+                        sent = client_socket.sendfile(f, offset=sent_size, count=min(PROGRESS_CHECK_BYTES, file_size - sent_size))
+                        if not sent:
                             break
-                        client_socket.sendall(chunk)
-                        sent_size += len(chunk)
-                        if sent_size % (DEFAULT_BUFFER_SIZE * 10) == 0:  # 每发送约40KB记录一次日志
-                            logger.info(f"已发送 {sent_size}/{file_size} 字节 ({sent_size/file_size*100:.1f}%)")
+                        sent_size += sent
+                        logger.info(f"已发送 {sent_size}/{file_size} 字节 ({sent_size/file_size*100:.1f}%)")
 
                 logger.info(f"数据库文件发送完成，总共发送: {sent_size} 字节")
             except Exception as e:
@@ -252,11 +362,73 @@ class SyncServer:
         except Exception as e:
             logger.error(f"处理数据库下载请求时发生错误: {str(e)}")
             try:
-                send_data(client_socket, json.dumps({"status": "error", "message": str(e)}))
+                send_data(client_socket, json_dumps({"status": "error", "message": str(e)}))
             except:
                 logger.error("无法发送错误信息到客户端")
                 pass
 
+    def _new_backup_path(self, full_dest_path, rel_path):
+        """生成不与已有备份重名的备份文件路径
+
+        文件名包含相对路径的哈希和微秒时间戳，不同目录下的同名文件、同一秒内的多次备份不会互相覆盖
+
+        Args:
+            full_dest_path: 要备份的文件完整路径
+            rel_path: 文件相对路径
+
+        Returns:
+            备份文件路径，该路径上已创建空文件，调用方随后用备份内容覆盖它
+        """
+        path_tag = hashlib.md5(rel_path.encode(DEFAULT_ENCODING)).hexdigest()[:8]
+        base_name = f"{full_dest_path.name}_{path_tag}_{int(time.time() * 1000000)}"
+        backup_path = self.backup_dir / base_name
+        counter = 1
+        while True:
+            # 以独占方式创建空文件占用该文件名，多个线程同时备份时也不会选中同一个名字
+            try:
+                with open(backup_path, 'x'):
+                    pass
+                return backup_path
+            except FileExistsError:
+                backup_path = self.backup_dir / f"{base_name}_{counter}"
+                counter += 1
+
+    def _backup_file(self, full_dest_path, backup_path, copy, known_hash=None):
+        """备份已存在的文件，供handle_file_sync在后台线程中调用
+
+        Args:
+            full_dest_path: 要备份的文件完整路径
+            backup_path: 备份文件路径
+            copy: 是否复制文件，为False时只计算哈希，由调用方随后把原文件移动到备份目录
+            known_hash: 数据库中记录的原文件哈希，提供时不再重新计算
+
+        Returns:
+            原文件的哈希值
+        """
+        if copy:
+            copy_file(full_dest_path, backup_path)
+        return known_hash or calculate_file_hash(full_dest_path)
+
+    def _add_backup_row(self, backup_rows, rel_path, backup_path, original_stat, hash_value):
+        """记录一条备份信息
+
+        Args:
+            backup_rows: 待写入数据库的备份记录列表
+            rel_path: 文件相对路径
+            backup_path: 备份文件路径
+            original_stat: 原文件的stat结果
+            hash_value: 原文件的哈希值
+        """
+        backup_rows.append((
+            rel_path,
+            str(backup_path.relative_to(self.script_dir)),
+            original_stat.st_size,
+            original_stat.st_mtime,
+            time.time(),
+            hash_value
+        ))
+        logger.info(f"已备份文件: {rel_path} -> {backup_path}")
+
     def handle_file_sync(self, client_socket, client_ip, request, thread_db=None):
         """处理文件同步请求
 
@@ -268,88 +440,147 @@ class SyncServer:
         """
         # 如果没有提供线程特定的数据库连接，则使用全局数据库连接
         db = thread_db if thread_db is not None else self.db
-        files_to_sync = request.get('files', [])
-        file_count = len(files_to_sync)
 
-        logger.info(f"客户端 {client_ip} 请求同步 {file_count} 个文件")
+        logger.info(f"客户端 {client_ip} 请求同步文件")
+
+        # 旧版本客户端在请求中携带JSON文件列表（协议版本0），与当前的数据帧格式不兼容
+        protocol = request.get('protocol', 0)
+        if protocol != PROTOCOL_VERSION:
+            logger.error(f"客户端 {client_ip} 使用不支持的同步协议版本: {protocol}")
+            send_data(client_socket, json_dumps({"status": "error", "message": f"Unsupported protocol version: {protocol}"}))
+            return
 
         # 发送准备就绪信息
-        send_data(client_socket, json.dumps({"status": "ready"}))
+        send_data(client_socket, json_dumps({"status": "ready"}))
 
         # 接收文件
         received_files = 0
+        file_count = 0
+        failed_files = []  # 哈希校验失败的文件，在同步完成信息中返回给客户端
         parent_dir = self.script_dir.parent
 
-        for file_info in files_to_sync:
-            rel_path = file_info.get('path')
-            file_size = file_info.get('size')
-            file_hash = file_info.get('hash')
-            modified_time = file_info.get('modified_time')
-
-            # 构建完整的目标路径
-            full_dest_path = parent_dir / rel_path
-
-            # 确保目标目录存在
-            full_dest_path.parent.mkdir(parents=True, exist_ok=True)
-
-            # 如果文件已存在，备份它
-            if full_dest_path.exists():
-                # 生成备份文件名
-                backup_filename = f"{full_dest_path.name}_{int(time.time())}"
-                backup_path = self.backup_dir / backup_filename
-
-                # 复制文件到备份目录
-                shutil.copy2(full_dest_path, backup_path)
-
-                # 记录备份信息
-                original_file_stat = full_dest_path.stat()
-                db.backup_file(
-                    rel_path,
-                    str(backup_path.relative_to(self.script_dir)),
-                    original_file_stat.st_size,
-                    original_file_stat.st_mtime,
-                    calculate_file_hash(full_dest_path)
-                )
-
-                logger.info(f"已备份文件: {rel_path} -> {backup_path}")
-
-            # 发送准备接收文件的信息
-            send_data(client_socket, json.dumps({"status": "ready_for_file"}))
-
-            # 接收文件内容
-            with open(full_dest_path, 'wb') as f:
-                received_size = 0
-                while received_size < file_size:
-                    chunk = client_socket.recv(min(DEFAULT_BUFFER_SIZE, file_size - received_size))
-                    if not chunk:
-                        break
-                    f.write(chunk)
-                    received_size += len(chunk)
-
-            # 验证文件哈希
-            received_hash = calculate_file_hash(full_dest_path)
-            if received_hash != file_hash:
-                logger.warning(f"文件哈希不匹配: {rel_path}")
-                send_data(client_socket, json.dumps({"status": "hash_mismatch"}))
-            else:
-                # 更新文件修改时间
-                os.utime(full_dest_path, (time.time(), modified_time))
-
-                # 更新数据库
-                db.cursor.execute('''
-                INSERT OR REPLACE INTO files (path, size, modified_time, hash, last_sync_time)
-                VALUES (?, ?, ?, ?, ?)
-                ''', (rel_path, file_size, modified_time, file_hash, time.time()))
-                db.conn.commit()
-
-                send_data(client_socket, json.dumps({"status": "file_received"}))
+        # 所有文件复用同一块接收缓冲区，避免每次recv都分配新的bytes对象
+        buf = bytearray(DEFAULT_BUFFER_SIZE)
+        mv = memoryview(buf)
+
+        # 备份在单独的线程中进行，与接收新文件内容重叠
+        backup_executor = ThreadPoolExecutor(max_workers=1)
+
+        # 备份记录和同步记录在接收结束后（包括连接中断时）各用一个事务批量写入
+        backup_rows = []
+        synced_rows = []
+
+        try:
+            while True:
+                # 接收文件数据帧头，客户端连续发送所有文件，直到发送空路径的结束帧
+                header = receive_file_header(client_socket)
+                if header is None:
+                    logger.warning(f"接收文件时连接关闭，已接收 {received_files}/{file_count} 个文件")
+                    return
+
+                rel_path, file_size, modified_time, file_hash = header
+                if not rel_path:
+                    break
+                file_count += 1
+
+                # 客户端无法读取该文件时会发送不带哈希的空帧
+                if not file_hash:
+                    logger.warning(f"客户端未能发送文件: {rel_path}")
+                    continue
+
+                # 构建完整的目标路径
+                full_dest_path = parent_dir / rel_path
+
+                # 确保目标目录存在
+                full_dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+                # 如果文件已存在，在后台线程中备份它，同时主线程把新内容接收到临时文件
+                try:
+                    dest_stat = full_dest_path.stat()
+                except FileNotFoundError:
+                    dest_stat = None
+
+                backup_future = None
+                if dest_stat is not None:
+                    # 与备份目录在同一文件系统上时，接收完成后直接把原文件移动到备份目录，无需复制
+                    rename_backup = dest_stat.st_dev == self.backup_dev
+                    # 复制备份在后台进行，需要先确定备份文件名；移动备份在移动时再生成
+                    backup_path = None if rename_backup else self._new_backup_path(full_dest_path, rel_path)
+
+                    # 数据库中记录的大小和修改时间与当前文件一致时，直接使用已知的哈希，无需重新读取文件
+                    file_info = db.get_file_info(rel_path)
+                    backup_hash = None
+                    if (file_info and file_info['size'] == dest_stat.st_size
+                            and file_info['modified_time'] == dest_stat.st_mtime):
+                        backup_hash = file_info['hash']
+
+                    if not (rename_backup and backup_hash):
+                        backup_future = backup_executor.submit(
+                            self._backup_file, full_dest_path, backup_path, not rename_backup, backup_hash
+                        )
+
+                temp_path = full_dest_path.with_name(f".{full_dest_path.name}.{threading.get_ident()}.part")
+                try:
+                    try:
+                        # 接收文件内容，边接收边计算哈希，避免写入后重新读取文件
+                        hasher = hashlib.md5()
+                        with open(temp_path, 'wb') as f:
+                            received_size = 0
+                            while received_size < file_size:
+                                n = client_socket.recv_into(mv[:min(DEFAULT_BUFFER_SIZE, file_size - received_size)])
+                                if n == 0:
+                                    break
+                                f.write(mv[:n])
+                                hasher.update(mv[:n])
+                                received_size += n
+                    finally:
+                        # 替换原文件之前必须等待备份完成，已复制的备份无论接收是否成功都要记录
+                        if backup_future is not None:
+                            backup_hash = backup_future.result()
+                            if not rename_backup:
+                                self._add_backup_row(backup_rows, rel_path, backup_path, dest_stat, backup_hash)
+
+                    if received_size < file_size:
+                        logger.warning(f"接收文件时连接中断: {rel_path}, 已接收 {received_size}/{file_size} 字节")
+                        return
+
+                    # 验证文件哈希
+                    if hasher.hexdigest() != file_hash:
+                        logger.warning(f"文件哈希不匹配: {rel_path}")
+                        failed_files.append(rel_path)
+                        continue
+
+                    # 保留原文件的权限，更新文件修改时间后替换原文件
+                    if dest_stat is not None:
+                        os.chmod(temp_path, stat.S_IMODE(dest_stat.st_mode))
+                        if rename_backup:
+                            backup_path = self._new_backup_path(full_dest_path, rel_path)
+                            os.replace(full_dest_path, backup_path)
+                            self._add_backup_row(backup_rows, rel_path, backup_path, dest_stat, backup_hash)
+                    os.utime(temp_path, (time.time(), modified_time))
+                    os.replace(temp_path, full_dest_path)
+                finally:
+                    # 接收失败或校验失败时删除临时文件，原文件保持不变
+                    if temp_path.exists():
+                        temp_path.unlink()
+
+                # 记录待更新的数据库信息
+                synced_rows.append((rel_path, file_size, modified_time, file_hash, time.time()))
+
                 received_files += 1
-                logger.info(f"已接收文件 ({received_files}/{file_count}): {rel_path}")
+                logger.info(f"已接收文件 ({received_files}): {rel_path}")
+        finally:
+            backup_executor.shutdown()
+            if backup_rows:
+                db.backup_files_batch(backup_rows)
+            if synced_rows:
+                db.update_synced_files(synced_rows)
 
         # 发送同步完成信息
-        send_data(client_socket, json.dumps({
+        send_data(client_socket, json_dumps({
             "status": "sync_complete",
-            "received_files": received_files
+            "received_files": received_files,
+            "failed": failed_files
         }))
 
         logger.info(f"客户端 {client_ip} 同步完成，共接收 {received_files}/{file_count} 个文件")
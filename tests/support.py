@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试辅助模块
+
+服务端和恢复工具都以脚本所在目录的上一级为根目录，测试时把项目模块复制到临时目录中的sync子目录再运行
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+def make_sync_root():
+    """创建临时根目录，并把项目模块和排除配置复制到其中的sync子目录
+
+    Returns:
+        (临时根目录, sync子目录) 元组，调用方负责删除临时根目录
+    """
+    root = Path(tempfile.mkdtemp())
+    sync_dir = root / "sync"
+    sync_dir.mkdir()
+    for name in os.listdir(PROJECT_DIR):
+        if name.endswith('.py') or name == 'exclude.conf':
+            shutil.copy2(PROJECT_DIR / name, sync_dir / name)
+    return root, sync_dir
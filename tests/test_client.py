@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+客户端测试
+
+验证文件同步提前结束后，compare_files会分离服务端数据库并保存已计算的哈希，重试时可以正常对比
+"""
+
+import sys
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+# 将项目目录添加到模块搜索路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import DEFAULT_HASH_WORKERS, EXCLUDED_EXTENSIONS, EXCLUDED_DIRECTORIES, EXCLUDED_PATHS
+from database import FileDatabase
+from client import SyncClient
+from utils import send_data, receive_data, json_dumps
+
+# compare_files最多同时计算这么多个文件的哈希
+MAX_PENDING = DEFAULT_HASH_WORKERS * 4
+
+# 文件数量超过在途任务上限，提前结束时查询还没有读完
+FILE_COUNT = MAX_PENDING * 2
+
+class CompareFilesTest(unittest.TestCase):
+    """compare_files提前结束与重试测试"""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        sync_dir = self.root / "sync"
+        sync_dir.mkdir()
+        for i in range(FILE_COUNT):
+            (self.root / f"file{i}.txt").write_bytes(f"content {i}\n".encode())
+
+        # 只测试文件对比，不需要连接服务端
+        self.client = SyncClient.__new__(SyncClient)
+        self.client.script_dir = sync_dir
+        self.client._scan_future = None
+        self.client._set_exclude_rules(
+            frozenset(EXCLUDED_EXTENSIONS), frozenset(EXCLUDED_DIRECTORIES), frozenset(EXCLUDED_PATHS)
+        )
+        self.client.db = FileDatabase(sync_dir / "file_sync_client.db")
+        self.client.db.scan_directory(self.root)
+
+        # 空的服务端数据库，所有文件都需要同步
+        self.server_db_path = self.root / "server.db"
+        FileDatabase(self.server_db_path).close()
+
+        self.sock, self.peer = socket.socketpair()
+        self.sock.settimeout(5)
+        self.peer.settimeout(5)
+
+    def tearDown(self):
+        self.sock.close()
+        self.peer.close()
+        self.client.db.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _attached_databases(self):
+        return [row[1] for row in self.client.db.conn.execute("PRAGMA database_list")]
+
+    def test_retry_after_server_not_ready(self):
+        # 服务端拒绝文件同步请求，sync_files在读完第一个文件后提前关闭生成器
+        def reply_not_ready():
+            receive_data(self.peer)
+            send_data(self.peer, json_dumps({"status": "error", "message": "Unsupported protocol version"}))
+
+        peer_thread = threading.Thread(target=reply_not_ready)
+        peer_thread.start()
+        self.client.sync_files(self.sock, self.client.compare_files(self.server_db_path))
+        peer_thread.join()
+
+        self.assertNotIn("srv", self._attached_databases())
+
+        # 已经提交计算的哈希在提前结束时也写回了数据库
+        hashed_count = self.client.db.conn.execute(
+            "SELECT COUNT(*) FROM files WHERE path GLOB 'file*.txt' AND hash IS NOT NULL"
+        ).fetchone()[0]
+        self.assertGreaterEqual(hashed_count, MAX_PENDING)
+
+        # 重试时可以再次附加服务端数据库并完成对比
+        paths = sorted(file_info['path'] for file_info in self.client.compare_files(self.server_db_path))
+        self.assertEqual(paths, sorted(f"file{i}.txt" for i in range(FILE_COUNT)))
+        self.assertNotIn("srv", self._attached_databases())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+配置模块测试
+
+验证数值类型的环境变量在取值无效时使用默认值
+"""
+
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 将项目目录添加到模块搜索路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import _env_number
+
+class EnvNumberTest(unittest.TestCase):
+    """_env_number测试"""
+
+    def _read(self, value, convert=int):
+        with mock.patch.dict(os.environ, {"SYNC_TEST_NUMBER": value}):
+            return _env_number("SYNC_TEST_NUMBER", 10, convert)
+
+    def test_valid_value(self):
+        self.assertEqual(self._read("4096"), 4096)
+        self.assertEqual(self._read("0.5", float), 0.5)
+
+    def test_unset_value(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("SYNC_TEST_NUMBER", None)
+            self.assertEqual(_env_number("SYNC_TEST_NUMBER", 10), 10)
+
+    def test_invalid_value_uses_default(self):
+        for value in ("0", "-1", "abc", ""):
+            with self.subTest(value=value):
+                with self.assertLogs("sync_tool", level="WARNING"):
+                    self.assertEqual(self._read(value), 10)
+        for value in ("0", "-0.5", "nan", "inf"):
+            with self.subTest(value=value):
+                with self.assertLogs("sync_tool", level="WARNING"):
+                    self.assertEqual(self._read(value, float), 10)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据库模块测试
+
+验证串行和并行遍历目录得到相同的文件
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+# 将项目目录添加到模块搜索路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import FileDatabase
+
+class WalkTest(unittest.TestCase):
+    """_walk与_walk_parallel测试"""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.tree = self.root / "tree"
+        for rel_path in ("top.txt", "a/x.txt", "a/b/y.txt", "c/z.txt", "empty/.keep"):
+            path = self.tree / rel_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(rel_path.encode())
+        # 指向目录的符号链接不会被进入，指向文件的符号链接按文件处理
+        os.symlink(self.tree / "a", self.tree / "link_dir")
+        os.symlink(self.tree / "top.txt", self.tree / "a" / "link_file")
+        self.db = FileDatabase(self.root / "test.db")
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_serial_and_parallel_walk_match(self):
+        serial = sorted(self.db._walk(self.tree))
+        parallel = sorted(self.db._walk_parallel(self.tree))
+        self.assertEqual(serial, parallel)
+
+        rel_paths = sorted(os.path.relpath(path, self.tree).replace(os.sep, '/') for path, _, _ in serial)
+        self.assertEqual(rel_paths, ["a/b/y.txt", "a/link_file", "a/x.txt", "c/z.txt", "empty/.keep", "top.txt"])
+
+if __name__ == "__main__":
+    unittest.main()
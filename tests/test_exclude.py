@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+排除规则测试
+
+验证在SQLite中执行的排除判断与SyncClient.should_exclude_file对同一批路径给出相同的结果
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+# 将项目目录添加到模块搜索路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import load_exclude_config
+from client import SyncClient, _EXCLUDED_SQL
+
+EXCLUDE_CONF = """
+ext:.LOG
+ext:log
+ext:.tar.gz
+dir:__pycache__
+dir:a/b
+dir:[build]
+path:docs/private
+path:sync/file.db
+"""
+
+# 相对路径使用'/'分隔，写入数据库前转换为本机路径分隔符
+PATHS = [
+    "a.log", "A.LOG", "dir/Mixed.Log", ".log", "dir/.log", "dir/..log", "dir/a..log", ".hidden.log",
+    "catalog", "dir/catalog", "x.tar.gz", "x.gz", "mod.pyc", "data.db-journal", "file.", "README", "dir.log/x.txt",
+    "__pycache__/m.py", "pkg/__pycache__/m.py", "pkg/sub/__pycache__", "pkg/__pycache__x/m.py", "pkg/x__pycache__/m.py",
+    "a/b/c.txt", "a/b", "[build]/out.txt", "b/out.txt",
+    "docs/private", "docs/private/x.txt", "docs/privatex.txt", "other/docs/private/x.txt",
+    "sync/file.db", "sync/file.dbx", "src/[x]*.py", "src/x?.py",
+]
+
+class ExcludeRulesTest(unittest.TestCase):
+    """SQL排除规则与should_exclude_file一致性测试"""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        config_file = self.tmp_dir / "exclude.conf"
+        config_file.write_text(EXCLUDE_CONF, encoding='utf-8')
+
+        # 只测试排除规则，不需要初始化数据库和网络连接
+        self.client = SyncClient.__new__(SyncClient)
+        self.client._set_exclude_rules(*load_exclude_config(str(config_file)))
+
+        self.conn = sqlite3.connect(":memory:", isolation_level=None)
+        self.conn.execute("CREATE TABLE files (path TEXT)")
+        self.conn.executemany("INSERT INTO files (path) VALUES (?)", [(p.replace('/', os.sep),) for p in PATHS])
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _sql_results(self):
+        self.client._load_exclude_patterns(self.conn)
+        cursor = self.conn.execute(f"SELECT c.path, {_EXCLUDED_SQL} FROM files c")
+        return {path.replace(os.sep, '/'): bool(excluded) for path, excluded in cursor}
+
+    def test_sql_matches_should_exclude_file(self):
+        sql_results = self._sql_results()
+        for path in PATHS:
+            with self.subTest(path=path):
+                self.assertEqual(sql_results[path], self.client.should_exclude_file(path))
+
+    def test_expected_results(self):
+        sql_results = self._sql_results()
+        excluded = {
+            "a.log", "A.LOG", "dir/Mixed.Log", "dir/a..log", ".hidden.log", "mod.pyc", "data.db-journal",
+            "__pycache__/m.py", "pkg/__pycache__/m.py", "pkg/sub/__pycache__", "[build]/out.txt",
+            "docs/private", "docs/private/x.txt", "sync/file.db",
+        }
+        self.assertEqual({path for path, value in sql_results.items() if value}, excluded)
+
+    def test_reload_patterns(self):
+        # 同一连接上重复加载规则时不会保留旧规则
+        self._sql_results()
+        self.client._set_exclude_rules(frozenset(), frozenset(), frozenset(["README"]))
+        sql_results = self._sql_results()
+        self.assertEqual({path for path, value in sql_results.items() if value}, {"README"})
+
+if __name__ == "__main__":
+    unittest.main()
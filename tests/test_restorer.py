@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文件恢复测试
+
+在临时目录中运行恢复命令，验证单个文件恢复失败时其他文件仍会恢复并写入数据库
+"""
+
+import sys
+import time
+import shutil
+import sqlite3
+import subprocess
+import unittest
+from pathlib import Path
+
+# 将项目目录添加到模块搜索路径
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from database import FileDatabase
+from tests.support import make_sync_root
+
+class RestoreTest(unittest.TestCase):
+    """按时间范围恢复文件测试"""
+
+    def setUp(self):
+        # 恢复工具以脚本所在目录的上一级为根目录，因此把模块复制到临时目录中运行
+        self.root, self.sync_dir = make_sync_root()
+        (self.sync_dir / "backups").mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _add_backup(self, db, original_path, content):
+        backup_name = original_path.replace('/', '_')
+        (self.sync_dir / "backups" / backup_name).write_bytes(content)
+        db.backup_files_batch([
+            (original_path, f"backups/{backup_name}", len(content), time.time() - 60, time.time(), None)
+        ])
+
+    def test_failed_file_does_not_abort_restore(self):
+        db = FileDatabase(self.sync_dir / "file_sync.db")
+        try:
+            self._add_backup(db, "blocked/x.txt", b"x\n")
+            self._add_backup(db, "ok/y.txt", b"y\n")
+        finally:
+            db.close()
+
+        # 目标目录的位置上是一个普通文件，无法创建目录
+        (self.root / "blocked").write_bytes(b"in the way\n")
+
+        result = subprocess.run(
+            [sys.executable, "sync_tool.py", "--restore",
+             "--start-time", "2000-01-01 00:00:00", "--end-time", "2100-01-01 00:00:00"],
+            cwd=self.sync_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60
+        )
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual((self.root / "ok" / "y.txt").read_bytes(), b"y\n")
+
+        conn = sqlite3.connect(self.sync_dir / "file_sync.db")
+        try:
+            paths = [row[0] for row in conn.execute("SELECT path FROM files")]
+        finally:
+            conn.close()
+        self.assertEqual(paths, ["ok/y.txt"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+服务端测试
+
+在临时目录中启动独立的服务端进程，验证空闲的持久连接不会让新客户端一直得不到响应、文件同步中的停顿不会被当作空闲、被替换文件的备份，以及启动后只为客户端会同步的文件预先计算哈希
+"""
+
+import os
+import sys
+import time
+import shutil
+import socket
+import sqlite3
+import hashlib
+import subprocess
+import unittest
+from pathlib import Path
+
+# 将项目目录添加到模块搜索路径
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from tests.support import make_sync_root
+from utils import send_data, receive_data, send_file_header, json_dumps, json_loads, PROTOCOL_VERSION
+
+CLIENT_WORKERS = 2
+IDLE_TIMEOUT = 1
+
+def _free_port():
+    """获取一个空闲的本地端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+class ServerTestCase(unittest.TestCase):
+    """在临时目录中启动服务端进程的测试基类"""
+
+    # 传给服务端进程的额外环境变量
+    server_env = {}
+
+    # 服务端启动前在同步根目录中创建的文件 {相对路径: 内容}
+    existing_files = {}
+
+    def setUp(self):
+        # 服务端会扫描脚本所在目录的上一级，因此把模块复制到临时目录中运行
+        self.root, sync_dir = make_sync_root()
+
+        # 服务端启动前已存在的文件，同步时会被备份
+        for rel_path, content in self.existing_files.items():
+            path = self.root / rel_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content)
+
+        self.port = _free_port()
+        env = dict(os.environ, **self.server_env)
+        self.server = subprocess.Popen(
+            [sys.executable, "sync_tool.py", "--server", "--port", str(self.port)],
+            cwd=sync_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self.sockets = []
+        self._wait_for_server()
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+        self.server.kill()
+        self.server.wait()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _wait_for_server(self):
+        """等待服务端开始监听"""
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                # 探测连接会占用一个处理名额，等待服务端检测到连接关闭
+                time.sleep(0.5)
+                return
+            except OSError:
+                time.sleep(0.1)
+        self.fail("服务端未能启动")
+
+    def _connect(self):
+        sock = socket.create_connection(('127.0.0.1', self.port), timeout=10)
+        self.sockets.append(sock)
+        return sock
+
+    def _time_sync(self):
+        """发送时间同步请求并返回服务端响应"""
+        sock = self._connect()
+        send_data(sock, json_dumps({"type": "time_sync", "client_time": time.time()}))
+        return json_loads(receive_data(sock))
+
+    def _sync_files(self, files, pause=0):
+        """按文件同步协议发送文件，返回服务端的同步完成信息
+
+        Args:
+            files: {相对路径: 内容}
+            pause: 收到准备就绪信息后、发送第一个数据帧前等待的秒数
+        """
+        sock = self._connect()
+        send_data(sock, json_dumps({"type": "file_sync", "protocol": PROTOCOL_VERSION}))
+        self.assertEqual(json_loads(receive_data(sock)).get("status"), "ready")
+        time.sleep(pause)
+        for rel_path, content in files.items():
+            send_file_header(sock, rel_path, len(content), time.time(), hashlib.md5(content).hexdigest())
+            sock.sendall(content)
+        send_file_header(sock, "", 0, 0, "")
+        return json_loads(receive_data(sock))
+
+class ServerConnectionTest(ServerTestCase):
+    """服务端连接数量限制与空闲超时测试"""
+
+    server_env = {"SYNC_CLIENT_WORKERS": str(CLIENT_WORKERS), "SYNC_CLIENT_IDLE_TIMEOUT": str(IDLE_TIMEOUT)}
+
+    def test_idle_connections_do_not_starve_new_clients(self):
+        # 建立超过处理线程数量的空闲连接
+        for _ in range(CLIENT_WORKERS + 1):
+            self._connect()
+        time.sleep(0.5)
+
+        # 处理线程全部被占用时，新客户端立即收到繁忙错误，而不是一直等待
+        response = self._time_sync()
+        self.assertEqual(response.get("status"), "error")
+        self.assertEqual(response.get("message"), "Server busy")
+
+        # 空闲连接超时关闭后，新客户端可以正常完成请求
+        time.sleep(IDLE_TIMEOUT + 1)
+        response = self._time_sync()
+        self.assertEqual(response.get("status"), "ok")
+
+    def test_slow_file_sync_is_not_idle(self):
+        # 文件同步过程中客户端在数据帧之间停顿（如计算哈希）超过空闲超时，连接不会被关闭
+        response = self._sync_files({"slow.txt": b"slow client\n"}, pause=IDLE_TIMEOUT + 1)
+        self.assertEqual(response.get("received_files"), 1)
+        self.assertEqual((self.root / "slow.txt").read_bytes(), b"slow client\n")
+
+class ServerBackupTest(ServerTestCase):
+    """服务端备份测试"""
+
+    existing_files = {
+        "a/config.py": b"old a\n",
+        "b/config.py": b"old b\n",
+    }
+
+    def test_same_named_files_get_distinct_backups(self):
+        # 不同目录下的同名文件在同一秒内先后被替换两次
+        response = self._sync_files({"a/config.py": b"new a\n", "b/config.py": b"new b\n"})
+        self.assertEqual(response.get("received_files"), 2)
+        response = self._sync_files({"a/config.py": b"newer a\n"})
+        self.assertEqual(response.get("received_files"), 1)
+
+        # 每次备份都保存在单独的文件中，数据库记录指向各自的内容
+        sync_dir = self.root / "sync"
+        conn = sqlite3.connect(sync_dir / "file_sync.db")
+        try:
+            rows = conn.execute("SELECT original_path, backup_path FROM backup_files ORDER BY id").fetchall()
+        finally:
+            conn.close()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(len({backup_path for _, backup_path in rows}), 3)
+        contents = [(original_path, (sync_dir / backup_path).read_bytes()) for original_path, backup_path in rows]
+        self.assertEqual(sorted(contents), [
+            ("a/config.py", b"new a\n"),
+            ("a/config.py", b"old a\n"),
+            ("b/config.py", b"old b\n"),
+        ])
+
+class ServerPrehashTest(ServerTestCase):
+    """服务端启动后预先计算哈希测试"""
+
+    existing_files = {
+        "data.txt": b"data\n",
+        "app.log": b"log\n",
+        "pkg/__pycache__/m.txt": b"cache\n",
+    }
+
+    def test_prehash_skips_excluded_files(self):
+        sync_dir = self.root / "sync"
+        deadline = time.monotonic() + 15
+        while True:
+            conn = sqlite3.connect(sync_dir / "file_sync.db")
+            try:
+                hashes = dict(conn.execute("SELECT path, hash FROM files").fetchall())
+            finally:
+                conn.close()
+            if hashes.get("data.txt") or time.monotonic() > deadline:
+                break
+            time.sleep(0.1)
+
+        self.assertEqual(hashes["data.txt"], hashlib.md5(b"data\n").hexdigest())
+
+        # 客户端从不同步的文件不计算哈希，包括服务端自身目录下的数据库和模块文件
+        skipped = [path for path in hashes if path != "data.txt"]
+        self.assertIn("app.log", skipped)
+        self.assertIn(os.path.join("pkg", "__pycache__", "m.txt"), skipped)
+        self.assertIn(os.path.join("sync", "server.py"), skipped)
+        self.assertEqual({path: hashes[path] for path in skipped}, dict.fromkeys(skipped))
+
+if __name__ == "__main__":
+    unittest.main()
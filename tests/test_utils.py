@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+工具模块测试
+
+验证控制消息的收发和长度检查
+"""
+
+import sys
+import socket
+import unittest
+from pathlib import Path
+
+# 将项目目录添加到模块搜索路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import MAX_MESSAGE_SIZE
+from utils import send_data, receive_data, json_dumps, json_loads
+
+class ReceiveDataTest(unittest.TestCase):
+    """receive_data测试"""
+
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair()
+        self.receiver.settimeout(5)
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def test_round_trip(self):
+        send_data(self.sender, json_dumps({"type": "time_sync", "path": "目录/文件.txt"}))
+        self.assertEqual(json_loads(receive_data(self.receiver)), {"type": "time_sync", "path": "目录/文件.txt"})
+
+    def test_rejects_oversized_length(self):
+        # 只发送长度头，不发送消息体：超过上限的长度必须在分配缓冲区之前被拒绝
+        self.sender.sendall((MAX_MESSAGE_SIZE + 1).to_bytes(4, byteorder='big'))
+        self.assertEqual(receive_data(self.receiver), b"{}")
+
+    def test_connection_closed(self):
+        self.sender.close()
+        self.assertEqual(receive_data(self.receiver), b"{}")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,41 +7,210 @@
 包含通用工具函数
 """
 
+import os
 import hashlib
 import json
 import socket
-from config import DEFAULT_BUFFER_SIZE, DEFAULT_ENCODING, logger
+import struct
+import shutil
+from config import DEFAULT_ENCODING, HASH_READ_SIZE, MAX_MESSAGE_SIZE, logger
 
-def calculate_file_hash(file_path):
+# orjson为可选依赖，未安装时使用标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# fcntl仅在类Unix系统上可用，用于通过FICLONE创建写时复制的文件副本
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux FICLONE ioctl请求码（_IOW(0x94, 9, int)）
+FICLONE = 0x40049409
+
+def json_dumps(obj):
+    """将对象序列化为JSON字节串
+
+    Args:
+        obj: 要序列化的对象
+
+    Returns:
+        UTF-8编码的JSON字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode(DEFAULT_ENCODING)
+
+def json_loads(data):
+    """解析JSON数据
+
+    Args:
+        data: JSON字符串或字节串
+
+    Returns:
+        解析后的对象
+    """
+    # orjson.JSONDecodeError是json.JSONDecodeError的子类，调用方无需区分
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def glob_escape(text):
+    """转义SQLite GLOB模式中的特殊字符
+
+    Args:
+        text: 原始字符串
+
+    Returns:
+        可以在GLOB模式中按字面匹配的字符串
+    """
+    return ''.join('[' + ch + ']' if ch in '*?[' else ch for ch in text)
+
+def calculate_file_hash(file_path, algorithm='md5'):
     """计算文件哈希值
 
+    优先使用hashlib.file_digest（Python 3.11+）在C层循环读取
+
     Args:
         file_path: 文件路径
+        algorithm: 哈希算法名称，默认为md5
 
     Returns:
-        文件的MD5哈希值
+        文件的哈希值（十六进制字符串）
     """
-    hash_md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+    with open(file_path, "rb", buffering=0) as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, algorithm).hexdigest()
+
+        # 旧版本Python：复用同一块缓冲区读取
+        hasher = hashlib.new(algorithm)
+        buf = bytearray(HASH_READ_SIZE)
+        view = memoryview(buf)
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            hasher.update(view[:n])
+    return hasher.hexdigest()
+
+def copy_file(src, dst):
+    """复制文件并保留元数据
+
+    优先使用copy_file_range在内核中复制（支持的文件系统上会直接共享数据块），
+    其次尝试FICLONE创建写时复制副本，都不可用时回退为shutil.copy2
+
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径
+    """
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            if hasattr(os, 'copy_file_range'):
+                try:
+                    copied = 0
+                    while copied < size:
+                        n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+                        if n == 0:
+                            break
+                        copied += n
+                    if copied == size:
+                        shutil.copystat(src, dst)
+                        return
+                except OSError:
+                    pass
+
+            if fcntl is not None:
+                try:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                    shutil.copystat(src, dst)
+                    return
+                except OSError:
+                    pass
+    except OSError as e:
+        logger.debug(f"快速复制文件失败，回退为普通复制: {src}, 错误: {str(e)}")
+
+    shutil.copy2(src, dst)
+
+# 仅Linux支持TCP_QUICKACK
+TCP_QUICKACK = getattr(socket, 'TCP_QUICKACK', None)
+
+# 文件同步协议版本，客户端在file_sync请求中携带，服务端拒绝无法识别的版本
+# 0: 旧版本，在JSON请求中携带完整文件列表；1: 文件信息以二进制数据帧逐个发送
+PROTOCOL_VERSION = 1
+
+# 文件数据帧头: 路径长度(u16) + 文件大小(u64) + 修改时间(f64) + MD5十六进制哈希(32字节)，其后紧跟路径和文件内容
+# 路径为空的帧表示文件流结束，哈希为空的帧表示客户端未能读取该文件
+FILE_HEADER = struct.Struct('>HQd32s')
+
+def send_file_header(sock, rel_path, file_size, modified_time, file_hash):
+    """发送文件数据帧头
+
+    Args:
+        sock: socket对象
+        rel_path: 文件相对路径
+        file_size: 随后发送的文件内容字节数
+        modified_time: 文件修改时间
+        file_hash: 文件哈希值
+    """
+    path_bytes = str(rel_path).encode(DEFAULT_ENCODING)
+    hash_bytes = (file_hash or '').encode('ascii')
+    sock.sendall(FILE_HEADER.pack(len(path_bytes), file_size, modified_time, hash_bytes) + path_bytes)
+
+def receive_exact(sock, size):
+    """接收指定字节数的数据
+
+    Args:
+        sock: socket对象
+        size: 要接收的字节数
+
+    Returns:
+        接收到的数据（bytearray），如果连接提前关闭则返回None
+    """
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            return None
+        received += n
+    return buf
+
+def receive_file_header(sock):
+    """接收文件数据帧头
+
+    Args:
+        sock: socket对象
+
+    Returns:
+        (rel_path, file_size, modified_time, file_hash) 元组，如果连接关闭则返回None
+    """
+    header = receive_exact(sock, FILE_HEADER.size)
+    if header is None:
+        return None
+
+    # 路径长度为u16，最多分配64KB；文件内容由调用方按file_size分块接收，不会一次性分配
+    path_len, file_size, modified_time, hash_bytes = FILE_HEADER.unpack(header)
+    path_bytes = receive_exact(sock, path_len)
+    if path_bytes is None:
+        return None
+
+    return path_bytes.decode(DEFAULT_ENCODING), file_size, modified_time, hash_bytes.rstrip(b'\0').decode('ascii')
 
 def send_data(sock, data):
     """发送数据
 
     Args:
         sock: socket对象
-        data: 要发送的数据
+        data: 要发送的数据（字符串或字节串）
     """
-    data_bytes = data.encode(DEFAULT_ENCODING)
-    length = len(data_bytes)
-
-    # 发送数据长度
-    sock.sendall(length.to_bytes(4, byteorder='big'))
+    data_bytes = data if isinstance(data, bytes) else data.encode(DEFAULT_ENCODING)
 
-    # 发送数据
-    sock.sendall(data_bytes)
+    # 数据长度和数据一次发送，避免头部和消息体分成两个小包
+    sock.sendall(len(data_bytes).to_bytes(4, byteorder='big') + data_bytes)
 
 def receive_data(sock):
     """接收数据
@@ -50,35 +219,43 @@ def receive_data(sock):
         sock: socket对象
 
     Returns:
-        接收到的数据，如果连接关闭则返回空JSON字符串
+        接收到的数据（bytearray，json_loads可直接解析），如果连接关闭或消息无效则返回空JSON对象
     """
-    # 接收数据长度
-    length_data = sock.recv(4)
-    if not length_data:
+    # Linux上TCP_QUICKACK不是持久设置，每次接收消息前重新启用，避免请求/响应交互时的延迟确认
+    if TCP_QUICKACK is not None:
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+        except OSError:
+            pass
+
+    # 接收数据长度（固定4字节，需处理只收到部分字节的情况）
+    length_data = receive_exact(sock, 4)
+    if length_data is None:
         logger.warning("接收数据时连接已关闭")
-        return "{}"  # 返回空JSON对象字符串，而不是None
+        return b"{}"  # 返回空JSON对象，而不是None
 
     length = int.from_bytes(length_data, byteorder='big')
+    if length == 0:
+        return b"{}"  # 如果没有接收到数据，返回空JSON对象
 
-    # 接收数据
-    data = b''
-    while len(data) < length:
-        chunk = sock.recv(min(DEFAULT_BUFFER_SIZE, length - len(data)))
-        if not chunk:
-            logger.warning("接收数据时连接中断")
-            break
-        data += chunk
+    # 长度来自对端，分配缓冲区之前先检查，避免一个伪造的长度头就让本端分配数GB内存
+    if length > MAX_MESSAGE_SIZE:
+        logger.warning(f"消息长度 {length} 超过上限 {MAX_MESSAGE_SIZE}，丢弃该连接的数据")
+        return b"{}"
 
-    if not data:
-        return "{}"  # 如果没有接收到数据，返回空JSON对象字符串
+    # 接收数据，一次性分配缓冲区后原地填充
+    data = receive_exact(sock, length)
+    if data is None:
+        logger.warning("接收数据时连接中断")
+        return b"{}"
 
-    return data.decode(DEFAULT_ENCODING)
+    return data
 
 def parse_json_response(response_data):
     """解析JSON响应数据
 
     Args:
-        response_data: 响应数据字符串
+        response_data: 响应数据（字节串或字符串）
 
     Returns:
         解析后的JSON对象，如果解析失败则返回空字典
@@ -88,7 +265,7 @@ def parse_json_response(response_data):
         return {}
 
     try:
-        return json.loads(response_data)
+        return json_loads(response_data)
     except json.JSONDecodeError as e:
         logger.error(f"JSON解析错误: {str(e)}")
         return {}